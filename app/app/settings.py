@@ -22,6 +22,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 # SECRET_KEY = 'django-insecure-&1k+lzsxgm76yua*14a#9(@1j)92&fj#8bx2yn57oxxhj=r1-q'
 SECRET_KEY = os.environ.get("DJANGO_SECRET", "changeme")
+# previous secret keys, still accepted for signatures while rotating
+SECRET_KEY_FALLBACKS = list(
+    filter(None, os.environ.get("DJANGO_SECRET_FALLBACKS", "").split(","))
+)
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = bool(int(os.environ.get("DEBUG", 0)))
 
@@ -39,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -49,6 +54,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.db.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,10 +93,142 @@ DATABASES = {
         'HOST': os.environ.get("DB_HOST"),
         'NAME': os.environ.get("DB_NAME"),
         'USER': os.environ.get("DB_USER"),
-        'PASSWORD': os.environ.get("DB_PASS")
+        'PASSWORD': os.environ.get("DB_PASS"),
+        # connections outlive the request and are checked before reuse;
+        # each worker thread holds at most one per database
+        'CONN_MAX_AGE': int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get("DB_CONN_HEALTH_CHECKS", 1))
+        ),
+    }
+}
+
+# optional read replica: GET/HEAD requests read from it, see core.db
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get("DB_REPLICA_HOST"),
+        'NAME': os.environ.get("DB_REPLICA_NAME", DATABASES['default']['NAME']),
+        'USER': os.environ.get("DB_REPLICA_USER", DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get(
+            "DB_REPLICA_PASS", DATABASES['default']['PASSWORD']
+        ),
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_REPLICA_ALIAS = 'replica' if 'replica' in DATABASES else None
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+# tests read from the primary unless they enable the replica themselves
+TEST_RUNNER = 'core.testrunner.PrimaryTestRunner'
+# a client's reads stay on the primary this long after it wrote
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.environ.get("DB_REPLICA_STICKY_SECONDS", 5)
+)
+# holds the "wrote recently" markers; must be shared by all workers
+DATABASE_REPLICA_STICKY_CACHE_ALIAS = os.environ.get(
+    "DB_REPLICA_STICKY_CACHE_ALIAS", 'default'
+)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# local memory by default (LRU culled at MAX_ENTRIES); point CACHE_BACKEND
+# at a shared backend (database, redis, memcached) in production
+
+# MAX_ENTRIES applies to these backends only; the redis and memcached
+# ones pass OPTIONS to their client library
+CULLED_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.db.DatabaseCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
+
+
+def cache_config(backend, location, max_entries):
+    config = {'BACKEND': backend, 'LOCATION': location}
+    if backend in CULLED_CACHE_BACKENDS:
+        config['OPTIONS'] = {'MAX_ENTRIES': max_entries}
+    return config
+
+
+CACHES = {
+    'default': cache_config(
+        os.environ.get(
+            "CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        os.environ.get("CACHE_LOCATION", ''),
+        int(os.environ.get("CACHE_MAX_ENTRIES", 10000)),
+    ),
 }
 
+# revoked signed tokens (core.tokens): a culled entry would make its
+# token valid again, so this cache is never culled. Point it at a backend
+# shared by all workers before enabling AUTH_TOKEN_MODE = 'signed'; a
+# system check refuses process-local ones. Every authenticated request
+# reads it, so a database cache costs one query per request: the deploy
+# uses redis, without an eviction policy (memcached would evict)
+CACHES['token_revocations'] = cache_config(
+    os.environ.get(
+        "TOKEN_REVOCATION_CACHE_BACKEND",
+        'django.core.cache.backends.locmem.LocMemCache'
+    ),
+    os.environ.get("TOKEN_REVOCATION_CACHE_LOCATION", 'token_revocations'),
+    2 ** 62,
+)
+
+# cached list responses and ETags (recipe.cache), 0 turns them off. They
+# are also off when WEB_WORKERS > 1 and the cache is local to each
+# process, as workers would not see each other's invalidations
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 300))
+# web server processes serving the app, set by scripts/run.sh
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", 1))
+
+# token -> user lookups of core.authentication.CachedTokenAuthentication,
+# in a per-process LRU unless TOKEN_AUTH_CACHE_ALIAS names a shared cache,
+# which several workers need to see each other's invalidations
+TOKEN_AUTH_CACHE_ALIAS = os.environ.get("TOKEN_AUTH_CACHE_ALIAS") or None
+TOKEN_AUTH_CACHE_TIMEOUT = int(os.environ.get("TOKEN_AUTH_CACHE_TIMEOUT", 60))
+TOKEN_AUTH_CACHE_MAX_ENTRIES = int(
+    os.environ.get("TOKEN_AUTH_CACHE_MAX_ENTRIES", 10000)
+)
+
+# the token endpoint issues database tokens ('db') or signed access and
+# refresh tokens ('signed', see core.tokens)
+AUTH_TOKEN_MODE = os.environ.get("AUTH_TOKEN_MODE", 'db')
+ACCESS_TOKEN_LIFETIME = int(os.environ.get("ACCESS_TOKEN_LIFETIME", 300))
+REFRESH_TOKEN_LIFETIME = int(
+    os.environ.get("REFRESH_TOKEN_LIFETIME", 24 * 60 * 60)
+)
+TOKEN_REVOCATION_CACHE_ALIAS = os.environ.get(
+    "TOKEN_REVOCATION_CACHE_ALIAS", 'token_revocations'
+)
+
+# build the recipe list from .values() rows instead of model serializers
+RECIPE_FAST_LIST = bool(int(os.environ.get("RECIPE_FAST_LIST", 0)))
+
+# WebP copies of uploaded recipe images, {name: longest edge in pixels},
+# rendered after the upload by a pool of RECIPE_IMAGE_WORKERS processes
+# (0 renders them in the request instead)
+RECIPE_IMAGE_DERIVATIVES = {
+    'thumbnail': int(os.environ.get("RECIPE_IMAGE_THUMBNAIL_SIZE", 240)),
+    'medium': int(os.environ.get("RECIPE_IMAGE_MEDIUM_SIZE", 960)),
+}
+RECIPE_IMAGE_QUALITY = int(os.environ.get("RECIPE_IMAGE_QUALITY", 80))
+RECIPE_IMAGE_WORKERS = int(os.environ.get("RECIPE_IMAGE_WORKERS", 2))
+
+# limits of recipe image uploads, checked while streaming and from the
+# image header (see recipe.uploads)
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get("RECIPE_IMAGE_MAX_BYTES", 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get("RECIPE_IMAGE_MAX_PIXELS", 40_000_000)
+)
+RECIPE_IMAGE_FORMATS = list(filter(
+    None, os.environ.get("RECIPE_IMAGE_FORMATS", "JPEG,PNG,WEBP").split(",")
+))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -142,9 +280,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # core.renderers/core.parsers encode with orjson when it is installed;
+    # swap in rest_framework.renderers.JSONRenderer and
+    # rest_framework.parsers.JSONParser for the stdlib implementation
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # core.throttling.SlidingWindowThrottle limits per user and endpoint;
+    # "<scope>.<action>" rates override the rate of the whole scope
+    'DEFAULT_THROTTLE_RATES': {
+        'recipe': os.environ.get("THROTTLE_RATE_RECIPE", '1200/min'),
+        'recipe.list': os.environ.get("THROTTLE_RATE_RECIPE_LIST", '300/min'),
+        'token': os.environ.get("THROTTLE_RATE_TOKEN", '30/min'),
+    },
 }
 
+# throttle counters; use a shared cache so all workers count together
+THROTTLE_CACHE_ALIAS = os.environ.get("THROTTLE_CACHE_ALIAS", 'default')
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
 }
\ No newline at end of file
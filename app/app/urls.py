@@ -22,12 +22,14 @@ from drf_spectacular.views import (
 )
 from django.conf.urls.static import static
 from django.conf import settings
+from core.views import DatabaseStatsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'),
          name='api-docs'),
+    path('api/db-stats/', DatabaseStatsView.as_view(), name='db-stats'),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls'))
 ]
@@ -0,0 +1,184 @@
+"""
+token authentication with cached token -> user lookups, and the
+authentication of the signed access tokens of core.tokens
+
+the users of valid tokens are kept in a bounded in-process LRU for
+TOKEN_AUTH_CACHE_TIMEOUT seconds, or in the shared cache named by
+TOKEN_AUTH_CACHE_ALIAS so all workers see invalidations. Entries are
+dropped by core.signals when the token is deleted or its user saved
+(deactivation, password change).
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication, TokenAuthentication, get_authorization_header
+)
+from rest_framework.authtoken.models import Token
+from core import tokens
+
+
+class LocalLRUCache:
+    """
+    thread-safe LRU with per-entry expiry, implementing the part of the
+    cache API the token cache uses
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aset(self, key, value, timeout):
+        self.set(key, value, timeout)
+
+
+_local_cache = None
+
+
+def get_token_cache():
+    global _local_cache
+    if settings.TOKEN_AUTH_CACHE_ALIAS:
+        return caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+    if _local_cache is None:
+        _local_cache = LocalLRUCache(settings.TOKEN_AUTH_CACHE_MAX_ENTRIES)
+    return _local_cache
+
+
+def token_cache_key(key):
+    return f'auth:token:{key}'
+
+
+def invalidate_token(key):
+    get_token_cache().delete(token_cache_key(key))
+
+
+def _cache_entry(token):
+    # requests may modify their user, so none of them gets the cached one
+    return copy.copy(token.user), token.created
+
+
+def _from_cache_entry(key, entry):
+    user, created = entry
+    user = copy.copy(user)
+    return user, Token(key=key, user=user, created=created)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication without the token + user query on cache hits"""
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        entry = cache.get(token_cache_key(key))
+        if entry is not None:
+            return _from_cache_entry(key, entry)
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(
+            token_cache_key(key), _cache_entry(token),
+            settings.TOKEN_AUTH_CACHE_TIMEOUT
+        )
+        return user, token
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    signed access tokens sent as "Authorization: Bearer <token>";
+    request.auth is the token payload
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        payload = tokens.verify(token)
+        return tokens.token_user(payload), payload
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class AsyncTokenAuthentication:
+    """
+    CachedTokenAuthentication and SignedTokenAuthentication for async
+    views: tokens and their users are read with the async ORM
+    """
+    keyword = 'Token'
+
+    async def authenticate(self, request):
+        """(user, token) for the request, None when it has no token"""
+        auth = request.headers.get('Authorization', '').split()
+        keyword = auth[0].lower() if auth else None
+        signed = SignedTokenAuthentication.keyword.lower()
+        if keyword not in (self.keyword.lower(), signed):
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        if keyword == signed:
+            payload = await tokens.averify(auth[1])
+            return tokens.token_user(payload), payload
+        return await self.authenticate_credentials(auth[1])
+
+    async def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        entry = await cache.aget(token_cache_key(key))
+        if entry is not None:
+            return _from_cache_entry(key, entry)
+
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        await cache.aset(
+            token_cache_key(key), _cache_entry(token),
+            settings.TOKEN_AUTH_CACHE_TIMEOUT
+        )
+        return token.user, token
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,84 @@
+"""
+system checks for settings that need a cache shared by all workers
+
+every manage.py command runs them, including the migrate of
+scripts/run.sh, so a misconfigured deployment stops before uWSGI
+starts its workers
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, Warning, register
+
+
+def is_process_local(alias):
+    """True when every process has its own copy of the cache"""
+    return isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+@register(Tags.caches)
+def check_token_revocation_cache(app_configs, **kwargs):
+    alias = settings.TOKEN_REVOCATION_CACHE_ALIAS
+    if settings.AUTH_TOKEN_MODE != 'signed' or not is_process_local(alias):
+        return []
+    return [Error(
+        f'Signed tokens need a shared revocation cache, but cache '
+        f'"{alias}" is local to each process: a revoked token would stay '
+        f'valid on every other worker.',
+        hint='Set TOKEN_REVOCATION_CACHE_BACKEND to a shared backend, '
+             'e.g. django.core.cache.backends.redis.RedisCache.',
+        id='core.E001',
+    )]
+
+
+@register(Tags.caches)
+def check_replica_sticky_cache(app_configs, **kwargs):
+    alias = settings.DATABASE_REPLICA_STICKY_CACHE_ALIAS
+    if not settings.DATABASE_REPLICA_ALIAS or not is_process_local(alias):
+        return []
+    return [Warning(
+        f'Cache "{alias}" is local to each process: after a write, only '
+        f'the worker that served it keeps the client on the primary, '
+        f'others may read stale rows from the replica.',
+        hint='Point DB_REPLICA_STICKY_CACHE_ALIAS at a shared cache.',
+        id='core.W001',
+    )]
+
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    alias = settings.RESPONSE_CACHE_ALIAS
+    if (
+        settings.RESPONSE_CACHE_TIMEOUT <= 0 or settings.WEB_WORKERS == 1
+        or not is_process_local(alias)
+    ):
+        return []
+    return [Warning(
+        f'The response cache and ETags are disabled: cache "{alias}" is '
+        f'local to each of the {settings.WEB_WORKERS} workers, which would '
+        f'serve stale responses after writes handled by another worker.',
+        hint='Point CACHE_BACKEND at a shared cache, e.g. '
+             'django.core.cache.backends.db.DatabaseCache.',
+        id='core.W002',
+    )]
+
+
+@register(Tags.caches)
+def check_token_auth_cache(app_configs, **kwargs):
+    alias = settings.TOKEN_AUTH_CACHE_ALIAS
+    if (
+        settings.TOKEN_AUTH_CACHE_TIMEOUT <= 0 or settings.WEB_WORKERS == 1
+        or (alias and not is_process_local(alias))
+    ):
+        return []
+    where = f'cache "{alias}"' if alias else 'an in-process LRU'
+    return [Warning(
+        f'Token lookups are cached in {where}, local to each of the '
+        f'{settings.WEB_WORKERS} workers: after a token is deleted or its '
+        f'user deactivated, the other workers accept it for up to '
+        f'TOKEN_AUTH_CACHE_TIMEOUT seconds.',
+        hint='Set TOKEN_AUTH_CACHE_ALIAS to a shared cache, or '
+             'TOKEN_AUTH_CACHE_TIMEOUT to 0.',
+        id='core.W003',
+    )]
@@ -0,0 +1,177 @@
+"""
+database routing and connection statistics
+
+ReplicaMiddleware sends the reads of GET/HEAD requests to the replica
+configured in settings.DATABASE_REPLICA_ALIAS. Writes always go to the
+primary. Only the models of REPLICA_APPS are routed: the cache table,
+sessions and auth tokens stay on the primary, and their writes (throttle
+counters, cached responses) do not make a request sticky. After a
+write, the client's reads stay on the primary for
+DATABASE_REPLICA_STICKY_SECONDS so it reads its own writes. Clients are
+recognised by their Authorization header or session cookie, and the
+marker lives in the cache named by DATABASE_REPLICA_STICKY_CACHE_ALIAS,
+which must be shared by all workers (see core.checks).
+
+Connections are persistent (CONN_MAX_AGE) and owned by the thread
+that opened them; the counters below show how often they are reused.
+"""
+import contextvars
+import hashlib
+import os
+import threading
+from collections import defaultdict
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# apps whose models read from the replica
+REPLICA_APPS = ('core', 'recipe')
+
+# {'primary': bool, 'wrote': bool} for the request being served
+_routing = contextvars.ContextVar('db_routing', default=None)
+
+
+def sticky_cache():
+    return caches[settings.DATABASE_REPLICA_STICKY_CACHE_ALIAS]
+
+
+def sticky_key(request):
+    """cache key of the client sending request, None when anonymous"""
+    credentials = request.headers.get('Authorization') or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not credentials:
+        return None
+    digest = hashlib.sha256(credentials.encode()).hexdigest()
+    return f'db:primary:{digest}'
+
+
+class ReplicaRouter:
+    """reads on the replica inside safe requests, everything else on the
+    primary"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        state = _routing.get()
+        if state is None or state['primary']:
+            return None
+        return settings.DATABASE_REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS:
+            return None
+        state = _routing.get()
+        if state is not None:
+            # the rest of the request reads what it just wrote
+            state['primary'] = state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == settings.DATABASE_REPLICA_ALIAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """pick the database of the request's reads"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        key = sticky_key(request)
+        primary = (
+            not settings.DATABASE_REPLICA_ALIAS
+            or request.method not in SAFE_METHODS
+            or (key is not None and sticky_cache().get(key) is not None)
+        )
+        state = {'primary': primary, 'wrote': False}
+        return key, state, _routing.set(state)
+
+    def _finish(self, key, state, token):
+        _routing.reset(token)
+        if state['wrote'] and key is not None:
+            sticky_cache().set(
+                key, True, settings.DATABASE_REPLICA_STICKY_SECONDS
+            )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key, state, token = self._start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self._finish(key, state, token)
+
+    async def __acall__(self, request):
+        key, state, token = self._start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            self._finish(key, state, token)
+
+
+class ConnectionStats:
+    """per-process counters of the persistent connections"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = defaultdict(lambda: defaultdict(int))
+            self._threads = defaultdict(set)
+
+    def connected(self, alias):
+        thread = threading.get_ident()
+        with self._lock:
+            counters = self._counters[alias]
+            counters['connects'] += 1
+            if thread in self._threads[alias]:
+                counters['reconnects'] += 1
+            self._threads[alias].add(thread)
+
+    def checkout(self):
+        """a request starts, with or without an open connection"""
+        for alias in connections:
+            reused = connections[alias].connection is not None
+            with self._lock:
+                self._counters[alias]['checkouts'] += 1
+                self._counters[alias]['reused'] += reused
+
+    def snapshot(self):
+        """
+        checkouts: requests served, reused: of which found the thread's
+        connection open, connects: connections opened, reconnects: of
+        which by a thread that had one before (expired or unusable),
+        threads: connections the process may hold open at once
+        """
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'databases': {
+                    alias: {
+                        name: counters[name] for name in (
+                            'checkouts', 'reused', 'connects', 'reconnects'
+                        )
+                    } | {'threads': len(self._threads[alias])}
+                    for alias, counters in self._counters.items()
+                },
+            }
+
+
+connection_stats = ConnectionStats()
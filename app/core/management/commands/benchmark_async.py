@@ -0,0 +1,172 @@
+"""
+concurrency benchmark of the recipe list: WSGI viewset vs ASGI async view
+
+requests go through the full handler stack in-process with the test
+clients. The WSGI path is served by a fixed pool of worker threads,
+like uWSGI; the ASGI path runs every request on one event loop.
+--db-latency adds a delay to each query to model a remote database.
+The response cache and the throttles are disabled for the run. The
+benchmark data belongs to a throwaway user deleted afterwards.
+"""
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from core.models import Recipe, Tag
+
+
+class Command(BaseCommand):
+    help = "Compare the WSGI and ASGI recipe list under concurrent load"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='worker threads of the WSGI path'
+        )
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help='milliseconds added to every query'
+        )
+
+    def _create_data(self, count):
+        user = get_user_model().objects.create_user(
+            email=f'benchmark-{uuid.uuid4().hex}@example.com',
+            password=uuid.uuid4().hex,
+        )
+        tag = Tag.objects.create(user=user, name='benchmark')
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user, title=f'Recipe {i}', time_minutes=10 + i % 50,
+                price=Decimal('4.50') + i % 100, link='',
+            )
+            for i in range(count)
+        ])
+        tag.recipe_set.add(*recipes)
+        return user, Token.objects.create(user=user)
+
+    def _add_latency(self, delay):
+        def wrapper(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            # a thread reconnects through the same wrapper object
+            if wrapper not in connection.execute_wrappers:
+                connection.execute_wrappers.append(wrapper)
+
+        # connections opened later by worker threads get it as well
+        connection_created.connect(install, weak=False)
+        install(None, connection)
+        return install
+
+    def _run_wsgi(self, url, headers, total, concurrency, threads):
+        # clients wait for a free worker, that wait counts in the latency
+        slots = threading.Semaphore(concurrency)
+
+        def fetch(sent):
+            try:
+                response = Client().get(url, headers=headers)
+                elapsed = time.perf_counter() - sent
+                connections.close_all()
+                assert response.status_code == 200, response.status_code
+                return elapsed
+            finally:
+                slots.release()
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for _ in range(total):
+                slots.acquire()
+                futures.append(pool.submit(fetch, time.perf_counter()))
+        return [future.result() for future in futures]
+
+    async def _run_asgi(self, url, headers, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            # ASGIHandler gives each request its own context for the
+            # async ORM, the test client does not
+            async with semaphore, ThreadSensitiveContext():
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                elapsed = time.perf_counter() - start
+                await sync_to_async(connections.close_all)()
+                assert response.status_code == 200, response.status_code
+                return elapsed
+
+        return await asyncio.gather(*(fetch() for _ in range(total)))
+
+    def _report(self, label, latencies, wall):
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f"{label:<24}{len(latencies) / wall:>10.1f}"
+            f"{statistics.median(latencies) * 1000:>10.1f}"
+            f"{p95 * 1000:>10.1f}"
+        )
+
+    # the test clients send requests for the 'testserver' host; the
+    # response cache stays out so both paths query on every request, and
+    # the throttles so that --requests is not capped by the list rate
+    @override_settings(
+        ALLOWED_HOSTS=['testserver'], RESPONSE_CACHE_TIMEOUT=0,
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}
+        },
+    )
+    def handle(self, **options):
+        total = options['requests']
+        user, token = self._create_data(options['recipes'])
+        headers = {'Authorization': f'Token {token.key}'}
+        install = None
+        if options['db_latency']:
+            install = self._add_latency(options['db_latency'] / 1000)
+
+        try:
+            self.stdout.write(
+                f"{total} requests, {options['concurrency']} concurrent, "
+                f"{options['threads']} WSGI threads, "
+                f"{options['db_latency']} ms per query"
+            )
+            self.stdout.write(
+                f"{'path':<24}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            )
+
+            start = time.perf_counter()
+            latencies = self._run_wsgi(
+                reverse('recipe:recipe-list'), headers, total,
+                options['concurrency'], options['threads']
+            )
+            self._report(
+                'wsgi (viewset)', latencies, time.perf_counter() - start
+            )
+
+            start = time.perf_counter()
+            latencies = asyncio.run(self._run_asgi(
+                reverse('recipe:async-recipe-list'), headers, total,
+                options['concurrency']
+            ))
+            self._report(
+                'asgi (async view)', latencies, time.perf_counter() - start
+            )
+        finally:
+            if install is not None:
+                connection_created.disconnect(install)
+                connection.execute_wrappers.clear()
+            user.delete()
@@ -0,0 +1,131 @@
+"""
+micro-benchmark of the API renderers and parsers on recipe list payloads
+
+the payload is generated deterministically, so runs are comparable.
+With --from-db the same recipes are stored and rendered by
+RecipeSerializer, as the list endpoint does; they are created in a
+transaction rolled back afterwards.
+"""
+import io
+import timeit
+import uuid
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from core.parsers import FastJSONParser, MessagePackParser
+from core.models import Ingredient, Recipe, Tag
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+from recipe.serializers import RecipeSerializer
+
+NEXT_PAGE = 'http://testserver/api/recipe/recipes/?cursor=cD0xMDA%3D'
+
+
+def recipe_payload(count):
+    """a page of the recipe list shaped like RecipeSerializer output"""
+    results = []
+    for i in range(count):
+        results.append({
+            'id': i,
+            'title': f'Pasta alla norma {i}',
+            'time_minutes': 10 + i % 50,
+            'price': str(Decimal('4.50') + i % 100),
+            'link': f'https://example.com/recipes/{i}.pdf',
+            'tags': [{'id': t, 'name': f'tag {t}'} for t in range(i % 5)],
+            'ingredients': [
+                {'id': n, 'name': f'ingredient {n}'} for n in range(i % 8)
+            ],
+            'thumbnail': None,
+        })
+    return {'next': NEXT_PAGE, 'previous': None, 'results': results}
+
+
+def serialized_payload(count):
+    """
+    the recipes of recipe_payload stored in the database, as the list
+    endpoint serializes them; call inside a transaction to roll back
+    """
+    user = get_user_model().objects.create_user(
+        email=f'benchmark-{uuid.uuid4().hex}@example.com',
+        password=uuid.uuid4().hex,
+    )
+    tags = Tag.objects.bulk_create(
+        [Tag(user=user, name=f'tag {t}') for t in range(5)]
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        [Ingredient(user=user, name=f'ingredient {n}') for n in range(8)]
+    )
+    recipes = Recipe.objects.bulk_create([
+        Recipe(
+            user=user, title=f'Pasta alla norma {i}',
+            time_minutes=10 + i % 50, price=Decimal('4.50') + i % 100,
+            link=f'https://example.com/recipes/{i}.pdf',
+        )
+        for i in range(count)
+    ])
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for i, recipe in enumerate(recipes) for tag in tags[:i % 5]
+    ])
+    Recipe.ingredients.through.objects.bulk_create([
+        Recipe.ingredients.through(
+            recipe_id=recipe.id, ingredient_id=ingredient.id
+        )
+        for i, recipe in enumerate(recipes)
+        for ingredient in ingredients[:i % 8]
+    ])
+    queryset = Recipe.objects.filter(user=user).prefetch_related(
+        'tags', 'ingredients'
+    ).order_by('id')
+    results = RecipeSerializer(queryset, many=True).data
+    return {'next': NEXT_PAGE, 'previous': None, 'results': results}
+
+
+class Command(BaseCommand):
+    help = "Compare size and render/parse time of the API formats"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--from-db', action='store_true',
+            help='render RecipeSerializer output of stored recipes'
+        )
+
+    def _best(self, func, iterations):
+        return min(timeit.repeat(func, number=1, repeat=iterations))
+
+    def handle(self, **options):
+        if options['from_db']:
+            with transaction.atomic():
+                payload = serialized_payload(options['recipes'])
+                transaction.set_rollback(True)
+        else:
+            payload = recipe_payload(options['recipes'])
+        iterations = options['iterations']
+        codecs = [
+            ('json (stdlib)', JSONRenderer(), JSONParser()),
+            ('json (fast)', FastJSONRenderer(), FastJSONParser()),
+            ('msgpack', MessagePackRenderer(), MessagePackParser()),
+        ]
+
+        source = 'serialized' if options['from_db'] else 'synthetic'
+        self.stdout.write(
+            f"{options['recipes']} {source} recipes, "
+            f"best of {iterations} runs"
+        )
+        self.stdout.write(
+            f"{'format':<16}{'bytes':>10}{'render ms':>12}{'parse ms':>12}"
+        )
+        for label, renderer, parser in codecs:
+            body = renderer.render(payload)
+            render = self._best(lambda: renderer.render(payload), iterations)
+            parse = self._best(
+                lambda: parser.parse(io.BytesIO(body)), iterations
+            )
+            self.stdout.write(
+                f"{label:<16}{len(body):>10}{render * 1000:>12.2f}"
+                f"{parse * 1000:>12.2f}"
+            )
@@ -0,0 +1,83 @@
+"""
+render the missing derivatives of recipe images
+
+covers images uploaded before derivatives existed, jobs lost when a web
+process stopped, and (with --all) a change of RECIPE_IMAGE_DERIVATIVES
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.models import Recipe
+from recipe.derivatives import (
+    delete_derivatives, record_derivatives, render_args
+)
+from recipe.imaging import render_derivatives
+
+
+class Command(BaseCommand):
+    help = "Generate the WebP derivatives of recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate the derivatives of every image'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.RECIPE_IMAGE_WORKERS or 1
+        )
+
+    def _rendered(self, processes, recipes, ahead):
+        """
+        (recipe, future) in order, with at most `ahead` renders queued so
+        the images read into memory stay bounded
+        """
+        pending = deque()
+        for recipe in recipes:
+            try:
+                args = render_args(recipe.image.name)
+            except OSError as exc:
+                self.stderr.write(f'recipe {recipe.pk}: {exc}')
+                continue
+            pending.append(
+                (recipe, processes.submit(render_derivatives, *args))
+            )
+            if len(pending) >= ahead:
+                yield pending.popleft()
+        yield from pending
+
+    def handle(self, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            recipes = recipes.filter(image_derivatives={})
+        recipes = recipes.only('id', 'user_id', 'image', 'image_derivatives')
+        workers = options['workers']
+
+        done = failed = 0
+        with ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('spawn')
+        ) as processes:
+            rendered = self._rendered(
+                processes, recipes.iterator(), 2 * workers
+            )
+            for recipe, future in rendered:
+                try:
+                    names = record_derivatives(
+                        recipe.pk, recipe.user_id, recipe.image.name,
+                        future.result()
+                    )
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'recipe {recipe.pk}: {exc}')
+                    continue
+                if names is not None:
+                    delete_derivatives(
+                        set(recipe.image_derivatives.values())
+                        - set(names.values())
+                    )
+                    done += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated derivatives for {done} recipes, {failed} failed'
+        ))
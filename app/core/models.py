@@ -1,6 +1,9 @@
 """Django models"""
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Lower
 import uuid
 import os
 from django.contrib.auth.models import (
@@ -48,6 +51,14 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class RecipeManager(models.Manager):
+
+    def get_queryset(self):
+        # search_vector is only read by the database, for full text
+        # search; loading the tsvector into every recipe would be wasted
+        return super().get_queryset().defer('search_vector')
+
+
 class Recipe(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -61,6 +72,29 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # {size name: storage name} of the resized WebP copies of image,
+    # filled in the background by recipe.derivatives
+    image_derivatives = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
+    # weighted title (A) + description (B), kept up to date by a database
+    # trigger (see migration 0007) so bulk writes are covered as well
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+            # one (user, key, id) index per sort key accepted by the API
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+            models.Index(fields=['user', 'price', 'id'],
+                         name='recipe_user_price_idx'),
+            models.Index(fields=['user', 'time_minutes', 'id'],
+                         name='recipe_user_time_idx'),
+            models.Index(fields=['user', 'title', 'id'],
+                         name='recipe_user_title_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -73,6 +107,16 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            # serves case insensitive prefix lookups (autocomplete)
+            models.Index(
+                'user',
+                OpClass(Lower('name'), name='text_pattern_ops'),
+                name='tag_prefix_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -84,5 +128,15 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            # serves case insensitive prefix lookups (autocomplete)
+            models.Index(
+                'user',
+                OpClass(Lower('name'), name='text_pattern_ops'),
+                name='ingredient_prefix_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
@@ -0,0 +1,69 @@
+"""
+API renderers
+
+FastJSONRenderer uses orjson when it is installed. Its output matches
+rest_framework's JSONRenderer (Decimal, datetimes, UUIDs and lazy
+strings go through the same encoder); pretty printed and ASCII only
+output fall back to the stdlib implementation.
+
+MessagePackRenderer renders the same data as binary MessagePack for
+clients sending `Accept: application/msgpack`.
+"""
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def _encoder_default(self, obj):
+        return self.encoder_class().default(obj)
+
+    def _use_orjson(self, accepted_media_type, renderer_context):
+        return (
+            orjson is not None
+            and self.encoder_class is encoders.JSONEncoder
+            and self.compact and not self.ensure_ascii
+            and self.get_indent(accepted_media_type, renderer_context) is None
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if not self._use_orjson(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data, default=self._encoder_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+        # same strict javascript subset escaping as JSONRenderer
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = encoders.JSONEncoder
+
+    def _encoder_default(self, obj):
+        # values without a MessagePack type get their JSON representation
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(
+            data, default=self._encoder_default, use_bin_type=True
+        )
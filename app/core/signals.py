@@ -0,0 +1,63 @@
+"""
+keep the connection statistics of core.db, the token cache of
+core.authentication and the revocation list of core.tokens up to date
+"""
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from core import tokens
+from core.authentication import invalidate_token
+from core.db import connection_stats
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    connection_stats.connected(connection.alias)
+
+
+@receiver(request_started)
+def count_checkout(sender, **kwargs):
+    # runs after close_old_connections dropped expired connections
+    connection_stats.checkout()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """a saved user may be deactivated or have a new password"""
+    if created:
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def revoke_signed_tokens(sender, instance, update_fields=None, **kwargs):
+    """deactivation and password changes revoke the user's signed tokens"""
+    if instance._state.adding or (
+        update_fields is not None
+        and not {'is_active', 'password'} & set(update_fields)
+    ):
+        return
+    saved = sender.objects.filter(pk=instance.pk).values(
+        'is_active', 'password'
+    ).first()
+    if saved is not None and (
+        (saved['is_active'] and not instance.is_active)
+        or saved['password'] != instance.password
+    ):
+        tokens.revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    """signed tokens carry the user id only, revoke them with the user"""
+    tokens.revoke_user(instance.pk)
@@ -0,0 +1,21 @@
+"""
+test runner keeping the tests on the primary database
+
+TestCase only allows queries on its `databases`, so with
+DB_REPLICA_HOST set the replica routing would break every test reading
+in a GET request. Tests of the routing opt in with
+override_settings(DATABASE_REPLICA_ALIAS='replica').
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class PrimaryTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._primary_only = override_settings(DATABASE_REPLICA_ALIAS=None)
+        self._primary_only.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._primary_only.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,126 @@
+"""
+tests for the cached token authentication
+"""
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core import authentication
+from core.authentication import LocalLRUCache, get_token_cache
+
+ME_URL = reverse("user:me")
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+    def test_least_recently_used_evicted(self):
+        lru = LocalLRUCache(max_entries=2)
+        lru.set("a", 1, 60)
+        lru.set("b", 2, 60)
+        lru.get("a")
+
+        lru.set("c", 3, 60)
+
+        self.assertEqual(lru.get("a"), 1)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("c"), 3)
+
+    def test_entries_expire(self):
+        lru = LocalLRUCache(max_entries=2)
+        with mock.patch("core.authentication.time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            lru.set("a", 1, 60)
+            monotonic.return_value = 159
+            self.assertEqual(lru.get("a"), 1)
+            monotonic.return_value = 160
+            self.assertIsNone(lru.get("a"))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123", name="Test"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cache_hit_skips_token_query(self):
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_reloads_user(self):
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"password": "newpass123"})
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+        user = self.client.get(ME_URL).wsgi_request.user
+
+        self.assertTrue(user.check_password("newpass123"))
+
+    def test_user_update_visible_on_next_request(self):
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"name": "Renamed"})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "Renamed")
+
+    def test_cached_user_not_shared_between_requests(self):
+        first = self.client.get(ME_URL).wsgi_request.user
+        first.name = "Changed in memory"
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "Test")
+
+    @override_settings(TOKEN_AUTH_CACHE_ALIAS="default")
+    def test_shared_cache(self):
+        cache.clear()
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+        self.assertIsNotNone(
+            cache.get(authentication.token_cache_key(self.token.key))
+        )
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
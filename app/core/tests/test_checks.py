@@ -0,0 +1,108 @@
+"""
+tests for the shared cache system checks
+"""
+from django.test import SimpleTestCase, override_settings
+from core import checks
+
+LOCAL_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+SHARED_CACHE = {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'cache_table',
+}
+
+
+class TokenRevocationCacheCheckTests(SimpleTestCase):
+    @override_settings(
+        AUTH_TOKEN_MODE='signed', CACHES={'default': LOCAL_CACHE},
+        TOKEN_REVOCATION_CACHE_ALIAS='default'
+    )
+    def test_signed_tokens_with_local_cache(self):
+        errors = checks.check_token_revocation_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(
+        AUTH_TOKEN_MODE='signed', CACHES={'default': SHARED_CACHE},
+        TOKEN_REVOCATION_CACHE_ALIAS='default'
+    )
+    def test_signed_tokens_with_shared_cache(self):
+        self.assertEqual(checks.check_token_revocation_cache(None), [])
+
+    @override_settings(
+        AUTH_TOKEN_MODE='db', CACHES={'default': LOCAL_CACHE},
+        TOKEN_REVOCATION_CACHE_ALIAS='default'
+    )
+    def test_database_tokens_need_no_revocations(self):
+        self.assertEqual(checks.check_token_revocation_cache(None), [])
+
+
+class ReplicaStickyCacheCheckTests(SimpleTestCase):
+    @override_settings(
+        DATABASE_REPLICA_ALIAS='replica', CACHES={'default': LOCAL_CACHE},
+        DATABASE_REPLICA_STICKY_CACHE_ALIAS='default'
+    )
+    def test_replica_with_local_sticky_cache(self):
+        warnings = checks.check_replica_sticky_cache(None)
+
+        self.assertEqual([warning.id for warning in warnings], ['core.W001'])
+
+    @override_settings(
+        DATABASE_REPLICA_ALIAS='replica', CACHES={'default': SHARED_CACHE},
+        DATABASE_REPLICA_STICKY_CACHE_ALIAS='default'
+    )
+    def test_replica_with_shared_sticky_cache(self):
+        self.assertEqual(checks.check_replica_sticky_cache(None), [])
+
+    @override_settings(DATABASE_REPLICA_ALIAS=None)
+    def test_no_replica(self):
+        self.assertEqual(checks.check_replica_sticky_cache(None), [])
+
+
+class ResponseCacheCheckTests(SimpleTestCase):
+    @override_settings(WEB_WORKERS=4, CACHES={'default': LOCAL_CACHE})
+    def test_several_workers_with_local_cache(self):
+        warnings = checks.check_response_cache(None)
+
+        self.assertEqual([warning.id for warning in warnings], ['core.W002'])
+
+    @override_settings(WEB_WORKERS=4, CACHES={'default': SHARED_CACHE})
+    def test_several_workers_with_shared_cache(self):
+        self.assertEqual(checks.check_response_cache(None), [])
+
+    @override_settings(WEB_WORKERS=1, CACHES={'default': LOCAL_CACHE})
+    def test_single_worker_with_local_cache(self):
+        self.assertEqual(checks.check_response_cache(None), [])
+
+
+class TokenAuthCacheCheckTests(SimpleTestCase):
+    @override_settings(WEB_WORKERS=4, TOKEN_AUTH_CACHE_ALIAS=None)
+    def test_several_workers_with_local_lru(self):
+        warnings = checks.check_token_auth_cache(None)
+
+        self.assertEqual([warning.id for warning in warnings], ['core.W003'])
+
+    @override_settings(
+        WEB_WORKERS=4, CACHES={'default': LOCAL_CACHE},
+        TOKEN_AUTH_CACHE_ALIAS='default'
+    )
+    def test_several_workers_with_local_cache(self):
+        warnings = checks.check_token_auth_cache(None)
+
+        self.assertEqual([warning.id for warning in warnings], ['core.W003'])
+
+    @override_settings(
+        WEB_WORKERS=4, CACHES={'default': SHARED_CACHE},
+        TOKEN_AUTH_CACHE_ALIAS='default'
+    )
+    def test_several_workers_with_shared_cache(self):
+        self.assertEqual(checks.check_token_auth_cache(None), [])
+
+    @override_settings(
+        WEB_WORKERS=4, TOKEN_AUTH_CACHE_ALIAS=None, TOKEN_AUTH_CACHE_TIMEOUT=0
+    )
+    def test_several_workers_without_token_cache(self):
+        self.assertEqual(checks.check_token_auth_cache(None), [])
+
+    @override_settings(WEB_WORKERS=1, TOKEN_AUTH_CACHE_ALIAS=None)
+    def test_single_worker_with_local_lru(self):
+        self.assertEqual(checks.check_token_auth_cache(None), [])
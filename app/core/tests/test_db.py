@@ -0,0 +1,209 @@
+"""
+tests for the database router, replica middleware and connection stats
+"""
+from decimal import Decimal
+from unittest import skipUnless
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.db import ConnectionStats, ReplicaMiddleware, sticky_key
+from core.models import Recipe
+
+DB_STATS_URL = reverse("db-stats")
+TOKEN = "Token 9944b09199c62bcf9418ad846dd0e4bbdfc6ee4b"
+
+
+@override_settings(DATABASE_REPLICA_ALIAS="replica")
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def _serve(self, request, write=False):
+        """the database the view's reads go to, after an optional write"""
+        used = []
+
+        def view(request):
+            if write:
+                router.db_for_write(Recipe)
+            used.append(router.db_for_read(Recipe))
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(request)
+        return used[0]
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(router.db_for_read(Recipe), "default")
+        self.assertEqual(router.db_for_write(Recipe), "default")
+
+    def test_safe_requests_read_from_replica(self):
+        for method in ("get", "head"):
+            request = getattr(self.factory, method)("/")
+            self.assertEqual(self._serve(request), "replica")
+
+    def test_writes_use_primary(self):
+        request = self.factory.post("/", HTTP_AUTHORIZATION=TOKEN)
+
+        self.assertEqual(self._serve(request, write=True), "default")
+
+    @override_settings(DATABASE_REPLICA_ALIAS=None)
+    def test_without_replica_reads_use_primary(self):
+        self.assertEqual(self._serve(self.factory.get("/")), "default")
+
+    def test_reads_after_write_stick_to_primary(self):
+        self._serve(
+            self.factory.post("/", HTTP_AUTHORIZATION=TOKEN), write=True
+        )
+
+        same_client = self.factory.get("/", HTTP_AUTHORIZATION=TOKEN)
+        other_client = self.factory.get("/", HTTP_AUTHORIZATION="Token x")
+        self.assertEqual(self._serve(same_client), "default")
+        self.assertEqual(self._serve(other_client), "replica")
+
+        # the window is over once the sticky key expires
+        cache.delete(sticky_key(same_client))
+        self.assertEqual(self._serve(same_client), "replica")
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND":
+                        "django.core.cache.backends.locmem.LocMemCache"},
+            "sticky": {"BACKEND":
+                       "django.core.cache.backends.locmem.LocMemCache",
+                       "LOCATION": "sticky"},
+        },
+        DATABASE_REPLICA_STICKY_CACHE_ALIAS="sticky",
+    )
+    def test_sticky_markers_in_configured_cache(self):
+        self._serve(
+            self.factory.post("/", HTTP_AUTHORIZATION=TOKEN), write=True
+        )
+        request = self.factory.get("/", HTTP_AUTHORIZATION=TOKEN)
+
+        self.assertIsNone(cache.get(sticky_key(request)))
+        self.assertTrue(caches["sticky"].get(sticky_key(request)))
+        self.assertEqual(self._serve(request), "default")
+
+    def test_cache_session_and_token_models_not_routed(self):
+        cache_entry = DatabaseCache("cache_table", {}).cache_model_class
+        used = []
+
+        def view(request):
+            for model in (cache_entry, Session, Token):
+                used.append(router.db_for_read(model))
+                used.append(router.db_for_write(model))
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(
+            self.factory.get("/", HTTP_AUTHORIZATION=TOKEN)
+        )
+
+        self.assertEqual(set(used), {"default"})
+        # cache writes (throttle counters, responses) are not sticky
+        request = self.factory.get("/", HTTP_AUTHORIZATION=TOKEN)
+        self.assertEqual(self._serve(request), "replica")
+
+    def test_write_inside_safe_request_pins_primary(self):
+        request = self.factory.get("/", HTTP_AUTHORIZATION=TOKEN)
+
+        self.assertEqual(self._serve(request, write=True), "default")
+        self.assertEqual(self._serve(request), "default")
+
+    def test_failed_write_request_not_sticky(self):
+        self._serve(self.factory.post("/", HTTP_AUTHORIZATION=TOKEN))
+
+        request = self.factory.get("/", HTTP_AUTHORIZATION=TOKEN)
+        self.assertEqual(self._serve(request), "replica")
+
+    async def test_async_requests(self):
+        used = []
+
+        async def view(request):
+            used.append(router.db_for_read(Recipe))
+            return HttpResponse()
+
+        await ReplicaMiddleware(view)(self.factory.get("/"))
+
+        self.assertEqual(used, ["replica"])
+
+
+@skipUnless("replica" in settings.DATABASES, "no replica configured")
+@override_settings(DATABASE_REPLICA_ALIAS="replica")
+class ReplicaDatabaseTests(TransactionTestCase):
+    """
+    run with DB_REPLICA_HOST set: the replica mirrors the test database
+    on its own connection, so rows must be committed to be read there
+    """
+    databases = "__all__"
+
+    def test_reads_served_by_replica(self):
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        Recipe.objects.create(
+            user=user, title="Sample", time_minutes=5, price=Decimal("1.00")
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with CaptureQueriesContext(connections["replica"]) as queries:
+            res = client.get(reverse("recipe:recipe-list"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertTrue(queries.captured_queries)
+
+
+class ConnectionStatsTests(TestCase):
+    def test_counts_connects_and_reconnects(self):
+        stats = ConnectionStats()
+
+        stats.connected("default")
+        stats.connected("default")
+
+        counters = stats.snapshot()["databases"]["default"]
+        self.assertEqual(counters["connects"], 2)
+        self.assertEqual(counters["reconnects"], 1)
+        self.assertEqual(counters["threads"], 1)
+
+    def test_counts_checkouts(self):
+        stats = ConnectionStats()
+
+        stats.checkout()
+
+        counters = stats.snapshot()["databases"]["default"]
+        self.assertEqual(counters["checkouts"], 1)
+        # the test case holds its transaction on an open connection
+        self.assertEqual(counters["reused"], 1)
+
+    def test_stats_endpoint_admin_only(self):
+        client = APIClient()
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        client.force_authenticate(user)
+        self.assertEqual(
+            client.get(DB_STATS_URL).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="testpass123"
+        )
+        client.force_authenticate(admin)
+        res = client.get(DB_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("pid", res.data)
+        self.assertIn("default", res.data["databases"])
@@ -0,0 +1,133 @@
+"""
+Tests for the fast JSON renderer and parser
+"""
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from core.models import Recipe
+from core.parsers import FastJSONParser, MessagePackParser
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+PAYLOAD = {
+    'id': 1,
+    'price': Decimal('10.50'),
+    'created': datetime.datetime(2023, 7, 28, 11, 42, 5, 123456,
+                                 tzinfo=datetime.timezone.utc),
+    'naive': datetime.datetime(2023, 7, 28, 11, 42),
+    'day': datetime.date(2023, 7, 28),
+    'at': datetime.time(11, 42, 5, 123456),
+    'duration': datetime.timedelta(minutes=30),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'label': gettext_lazy('Unable to authenticate User'),
+    'text': 'pammiggiana \u2028 top \u2029 è',
+    'tags': [{'id': 1, 'name': 'vegan'}],
+    'errors': {0: ['invalid']},
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_same_output_as_json_renderer(self):
+        expected = JSONRenderer().render(PAYLOAD)
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD), expected)
+
+    def test_aware_datetime_in_other_timezone(self):
+        tz = timezone.get_fixed_timezone(120)
+        data = {'at': datetime.datetime(2023, 1, 1, 10, tzinfo=tz)}
+
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_indent_falls_back_to_stdlib(self):
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type)
+        )
+
+    def test_without_orjson(self):
+        with patch('core.renderers.orjson', None):
+            body = FastJSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(body, JSONRenderer().render(PAYLOAD))
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def test_parse_same_as_json_parser(self):
+        body = JSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_parse_rejects_nan(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"price": NaN}'))
+
+    def test_without_orjson(self):
+        with patch('core.parsers.orjson', None):
+            data = FastJSONParser().parse(io.BytesIO(b'{"id": 1}'))
+
+        self.assertEqual(data, {'id': 1})
+
+
+class MessagePackTests(SimpleTestCase):
+    def test_round_trip_matches_json(self):
+        # MessagePack keeps non string keys, which the parser rejects
+        payload = {k: v for k, v in PAYLOAD.items() if k != 'errors'}
+        body = MessagePackRenderer().render(payload)
+        data = MessagePackParser().parse(io.BytesIO(body))
+
+        json_data = JSONParser().parse(
+            io.BytesIO(JSONRenderer().render(payload))
+        )
+        self.assertEqual(data, json_data)
+
+    def test_smaller_than_json(self):
+        payload = {'results': [{'id': i, 'title': 'Parmigiana',
+                                'price': '10.50'} for i in range(100)]}
+
+        self.assertLess(len(MessagePackRenderer().render(payload)),
+                        len(JSONRenderer().render(payload)))
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b'\xc1'))
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_benchmark_renderers(self):
+        out = StringIO()
+        call_command('benchmark_renderers', recipes=10, iterations=1,
+                     stdout=out)
+
+        self.assertIn('json (stdlib)', out.getvalue())
+        self.assertIn('json (fast)', out.getvalue())
+        self.assertIn('msgpack', out.getvalue())
+
+    def test_benchmark_renderers_from_db(self):
+        out = StringIO()
+        call_command('benchmark_renderers', recipes=10, iterations=1,
+                     from_db=True, stdout=out)
+
+        self.assertIn('10 serialized recipes', out.getvalue())
+        self.assertIn('msgpack', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,202 @@
+"""
+tests for the sliding-window throttle
+"""
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from core.throttling import SlidingWindowThrottle
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+ASYNC_RECIPES_URL = reverse("recipe:async-recipe-list")
+ASYNC_TAGS_URL = reverse("recipe:async-tag-list")
+TOKEN_URL = reverse("user:token")
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': rates,
+    })
+
+
+class ScopedView(APIView):
+    throttle_scope = "test"
+
+
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = APIRequestFactory().get("/")
+        self.request.user = None
+        self.view = ScopedView()
+        self.view.request = self.request
+
+    def _allow(self, now):
+        throttle = SlidingWindowThrottle()
+        throttle.timer = lambda: now
+        return throttle.allow_request(self.request, self.view), throttle
+
+    @throttle_rates(test="2/min")
+    def test_limit_within_window(self):
+        self.assertTrue(self._allow(0)[0])
+        self.assertTrue(self._allow(10)[0])
+
+        allowed, throttle = self._allow(20)
+
+        self.assertFalse(allowed)
+        # the full window fades out over the next one, from 60s on
+        self.assertEqual(throttle.wait(), 40)
+
+    @throttle_rates(test="2/min")
+    def test_previous_window_weighted(self):
+        self._allow(50)
+        self._allow(55)
+
+        # 15s into the next window: 2 * 0.75 + 0 < 2
+        self.assertTrue(self._allow(75)[0])
+        # 2 * (44 / 60) + 1 >= 2
+        allowed, throttle = self._allow(76)
+        self.assertFalse(allowed)
+        # 2 * (1 - x) + 1 < 2 needs x > 0.5, 90s
+        self.assertEqual(throttle.wait(), 14)
+        self.assertTrue(self._allow(91)[0])
+
+    @throttle_rates(test="2/min", **{"test.get": "1/min"})
+    def test_action_rate_overrides_scope_rate(self):
+        self.assertTrue(self._allow(0)[0])
+        self.assertFalse(self._allow(1)[0])
+
+    @throttle_rates(test="2/min")
+    def test_counter_expired_before_incr(self):
+        with mock.patch("django.core.cache.backends.locmem.LocMemCache.incr",
+                        side_effect=ValueError("missing key")):
+            self.assertTrue(self._allow(0)[0])
+
+        self.assertTrue(self._allow(1)[0])
+        self.assertFalse(self._allow(2)[0])
+
+    @throttle_rates()
+    def test_no_rate_not_throttled(self):
+        for now in range(5):
+            self.assertTrue(self._allow(now)[0])
+
+
+class ThrottledApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @throttle_rates(recipe="2/min")
+    def test_recipe_list_throttled_with_retry_after(self):
+        for _ in range(2):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(res["Retry-After"]), 0)
+
+    @throttle_rates(recipe="1/min")
+    def test_limits_per_user_and_endpoint(self):
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            email="other@example.com", password="testpass123"
+        ))
+
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(
+            self.client.get(TAGS_URL).status_code, status.HTTP_200_OK
+        )
+        self.assertEqual(other.get(RECIPES_URL).status_code,
+                         status.HTTP_200_OK)
+
+    @throttle_rates(token="2/min")
+    def test_token_endpoint_throttled_per_client(self):
+        payload = {"email": self.user.email, "password": "wrong"}
+        client = APIClient()
+
+        for _ in range(2):
+            res = client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", res)
+
+    @throttle_rates(recipe="1/min")
+    def test_window_expiry_allows_again(self):
+        with mock.patch("core.throttling.SlidingWindowThrottle.timer",
+                        return_value=1000.0):
+            self.client.get(RECIPES_URL)
+        with mock.patch("core.throttling.SlidingWindowThrottle.timer",
+                        return_value=1200.0):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ThrottledAsyncApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    @throttle_rates(recipe="2/min")
+    def test_async_list_throttled_with_retry_after(self):
+        for _ in range(2):
+            res = self.client.get(ASYNC_RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(res["Retry-After"]), 0)
+        self.assertIn("throttled", res.json()["detail"])
+
+    @throttle_rates(recipe="2/min")
+    def test_counters_shared_with_sync_endpoint(self):
+        self.client.get(RECIPES_URL)
+        self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(
+            self.client.get(ASYNC_RECIPES_URL).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(
+            self.client.get(ASYNC_TAGS_URL).status_code, status.HTTP_200_OK
+        )
+
+    @throttle_rates(recipe="10/min", **{"recipe.list": "1/min"})
+    def test_list_rate_applies_to_async_list(self):
+        self.client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(
+            self.client.get(ASYNC_TAGS_URL).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
@@ -0,0 +1,98 @@
+"""
+sliding-window request throttling
+
+the sliding window is approximated from two fixed windows, in O(1)
+time and space per client: the count of the previous window is
+weighted by how much of it still overlaps the sliding window. Counters
+live in the cache named by THROTTLE_CACHE_ALIAS. A local-memory cache
+works for a single process. Production needs a shared cache, so that
+all workers count together, and an in-memory one (redis, memcached):
+every request reads and writes its counters.
+"""
+import math
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    limit each user (or anonymous client address) per endpoint
+
+    the rate is read from DEFAULT_THROTTLE_RATES under
+    "<throttle_scope>.<action>", falling back to "<throttle_scope>", so
+    one endpoint of a view can get its own rate
+    """
+    timer = time.time
+
+    def get_rate(self, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return None
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        return rates.get(f'{scope}.{self.get_action(view)}', rates.get(scope))
+
+    def get_action(self, view):
+        return getattr(view, 'action', None) or view.request.method.lower()
+
+    def parse_rate(self, rate):
+        """'100/min' -> (100, 60)"""
+        count, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(count), duration
+
+    def get_cache_key(self, request, view, window):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = f'anon:{self.get_ident(request)}'
+        endpoint = getattr(view, 'basename', None) or type(view).__name__
+        return (
+            f'throttle:{view.throttle_scope}:{endpoint}.'
+            f'{self.get_action(view)}:{ident}:{window}'
+        )
+
+    def allow_request(self, request, view):
+        rate = self.get_rate(view)
+        if rate is None:
+            return True
+        limit, duration = self.parse_rate(rate)
+
+        now = self.timer()
+        window = int(now // duration)
+        elapsed = now / duration - window
+        current_key = self.get_cache_key(request, view, window)
+        previous_key = self.get_cache_key(request, view, window - 1)
+
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        counts = cache.get_many([previous_key, current_key])
+        previous = counts.get(previous_key, 0)
+        current = counts.get(current_key, 0)
+
+        if previous * (1 - elapsed) + current >= limit:
+            self.wait_seconds = self._wait(
+                limit, duration, previous, current, elapsed
+            )
+            return False
+
+        # a counter is read during its own window and the next one
+        cache.add(current_key, 0, 2 * duration)
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            # expired or culled since add(); this request starts it again
+            cache.set(current_key, 1, 2 * duration)
+        return True
+
+    def _wait(self, limit, duration, previous, current, elapsed):
+        """seconds until the weighted count drops below the limit"""
+        if current >= limit:
+            # only the current window's requests remain in the next one
+            return duration * (1 - elapsed + 1 - limit / current)
+        return max(duration * (1 - (limit - current) / previous - elapsed), 0)
+
+    def wait(self):
+        # rounded first so float noise does not add a second
+        return math.ceil(round(self.wait_seconds, 6))
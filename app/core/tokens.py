@@ -0,0 +1,154 @@
+"""
+stateless signed access tokens
+
+access tokens are signed with SECRET_KEY (HMAC-SHA256 through
+django.core.signing) and verified with one lookup in the revocation
+cache, so without a database query unless that cache is a database
+table. Tokens
+signed with a key from SECRET_KEY_FALLBACKS stay valid while the key
+is rotated. Refresh tokens are exchanged for a new pair at the refresh
+endpoint, which checks the user in the database.
+
+the revocation list lives in the cache named by
+TOKEN_REVOCATION_CACHE_ALIAS, which is never culled and must be shared
+by all workers (see core.checks). It holds the ids of revoked tokens
+and a per-user "not before" time, and each entry expires with the last
+token it can affect. Deleting a user revokes their tokens too.
+"""
+import time
+import uuid
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.utils.crypto import salted_hmac
+from rest_framework import exceptions
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+SALT = 'core.tokens'
+
+
+def _lifetime(kind):
+    if kind == ACCESS:
+        return settings.ACCESS_TOKEN_LIFETIME
+    return settings.REFRESH_TOKEN_LIFETIME
+
+
+def _revocations():
+    return caches[settings.TOKEN_REVOCATION_CACHE_ALIAS]
+
+
+def _jti_key(jti):
+    return f'auth:revoked:{jti}'
+
+
+def _user_key(user_id):
+    return f'auth:not-before:{user_id}'
+
+
+def password_fingerprint(user):
+    """changes with the password, so refresh tokens die with it"""
+    return salted_hmac(SALT, user.password).hexdigest()[:16]
+
+
+def _sign(user, kind):
+    payload = {
+        'typ': kind,
+        'uid': user.pk,
+        'jti': uuid.uuid4().hex,
+        'iat': time.time(),
+    }
+    if kind == REFRESH:
+        payload['pwd'] = password_fingerprint(user)
+    return signing.dumps(payload, salt=SALT, compress=True)
+
+
+def issue_tokens(user):
+    """a new access/refresh pair for user"""
+    return {
+        'access': _sign(user, ACCESS),
+        'refresh': _sign(user, REFRESH),
+        'expires_in': settings.ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def decode(token, kind):
+    """the payload of a valid, unexpired token of the given kind"""
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=_lifetime(kind))
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed('Token expired.')
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Invalid token.')
+    if not isinstance(payload, dict) or payload.get('typ') != kind:
+        raise exceptions.AuthenticationFailed('Invalid token.')
+    return payload
+
+
+def _check_revocations(payload, entries):
+    not_before = entries.get(_user_key(payload['uid']))
+    if _jti_key(payload['jti']) in entries or (
+        not_before is not None and payload['iat'] <= not_before
+    ):
+        raise exceptions.AuthenticationFailed('Token revoked.')
+
+
+def _revocation_keys(payload):
+    return [_jti_key(payload['jti']), _user_key(payload['uid'])]
+
+
+def verify(token, kind=ACCESS):
+    """decode token and check it against the revocation list"""
+    payload = decode(token, kind)
+    entries = _revocations().get_many(_revocation_keys(payload))
+    _check_revocations(payload, entries)
+    return payload
+
+
+async def averify(token, kind=ACCESS):
+    payload = decode(token, kind)
+    entries = await _revocations().aget_many(_revocation_keys(payload))
+    _check_revocations(payload, entries)
+    return payload
+
+
+def token_user(payload):
+    """
+    the user of an access token, loaded with only its primary key;
+    other fields are read from the database when first used
+    """
+    user_model = get_user_model()
+    return user_model.from_db(None, [user_model._meta.pk.attname], [
+        payload['uid']
+    ])
+
+
+def revoke(payload):
+    """put one token on the revocation list until it expires"""
+    remaining = payload['iat'] + _lifetime(payload['typ']) - time.time()
+    if remaining > 0:
+        _revocations().set(_jti_key(payload['jti']), True, remaining)
+
+
+def revoke_user(user_id):
+    """revoke every token issued to the user so far"""
+    _revocations().set(
+        _user_key(user_id), time.time(), settings.REFRESH_TOKEN_LIFETIME
+    )
+
+
+def refresh_tokens(token):
+    """
+    exchange a refresh token for a new pair; the old refresh token is
+    revoked
+    """
+    payload = verify(token, REFRESH)
+    user = get_user_model().objects.filter(pk=payload['uid']).first()
+    if (
+        user is None or not user.is_active
+        or payload.get('pwd') != password_fingerprint(user)
+    ):
+        raise exceptions.AuthenticationFailed('Invalid token.')
+    revoke(payload)
+    return issue_tokens(user)
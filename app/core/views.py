@@ -0,0 +1,17 @@
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.db import connection_stats
+
+
+class DatabaseStatsView(APIView):
+    """
+    connection statistics of the worker process serving the request,
+    for sizing max_connections against the worker count
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(connection_stats.snapshot())
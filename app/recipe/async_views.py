@@ -0,0 +1,182 @@
+"""
+async read path for recipes, tags and ingredients
+
+DRF views are synchronous, so these are plain Django async views that
+produce the same output as the list/retrieve endpoints of the
+viewsets. Authentication and queries use the async ORM: served over
+ASGI, a request waiting on a slow client or on the database does not
+hold a worker thread. Requests are throttled with the rates and the
+counters of the matching viewset endpoint.
+"""
+import functools
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from core.authentication import AsyncTokenAuthentication
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+from core.throttling import SlidingWindowThrottle
+from recipe.fastlist import (
+    arelated_by_recipe, format_rows, list_columns, source_columns
+)
+from recipe.filters import filter_recipes
+from recipe.pagination import RecipeCursorPagination
+from recipe.serializers import (
+    RecipeSerializer, RecipeDetailSerializer, TagSerializer,
+    IngredientSerializer
+)
+
+
+RELATED = {'tags': 'tag', 'ingredients': 'ingredient'}
+SAFE_METHODS = ('GET', 'HEAD')
+
+renderer = FastJSONRenderer()
+authenticator = AsyncTokenAuthentication()
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(
+        renderer.render(data), status=status_code,
+        content_type=renderer.media_type
+    )
+
+
+def exception_response(exc, request):
+    """the response DRF's exception handler would build for exc"""
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = json_response(data, exc.status_code)
+    if isinstance(exc, exceptions.MethodNotAllowed):
+        response['Allow'] = ', '.join(SAFE_METHODS)
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = '%d' % exc.wait
+    if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+        response['WWW-Authenticate'] = authenticator.authenticate_header(
+            request
+        )
+    return response
+
+
+class ThrottledEndpoint:
+    """the viewset endpoint whose rate and counters an async view shares"""
+    throttle_scope = 'recipe'
+
+    def __init__(self, basename, action):
+        self.basename = basename
+        self.action = action
+
+
+def async_api_view(basename, action):
+    """read-only, token authenticated async view returning JSON"""
+    endpoint = ThrottledEndpoint(basename, action)
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in SAFE_METHODS:
+                    raise exceptions.MethodNotAllowed(request.method)
+                auth = await authenticator.authenticate(request)
+                if auth is None:
+                    raise exceptions.NotAuthenticated()
+                request.user, request.auth = auth
+                throttle = SlidingWindowThrottle()
+                if not await sync_to_async(throttle.allow_request)(
+                    request, endpoint
+                ):
+                    raise exceptions.Throttled(throttle.wait())
+                return json_response(await view(request, *args, **kwargs))
+            except exceptions.APIException as exc:
+                return exception_response(exc, request)
+        return wrapper
+    return decorator
+
+
+def readable_fields(serializer):
+    return {
+        name: field for name, field in serializer.fields.items()
+        if not field.write_only
+    }
+
+
+async def related_for(recipe_ids, names):
+    return {
+        name: await arelated_by_recipe(
+            getattr(Recipe, name).through, RELATED[name], recipe_ids
+        )
+        for name in names if name in RELATED
+    }
+
+
+@async_api_view('recipe', 'list')
+async def recipe_list(request):
+    """recipe list: same filters, ordering and cursor pages as the viewset"""
+    fields = readable_fields(RecipeSerializer(context={'request': request}))
+    columns = source_columns(fields, RELATED)
+    queryset = filter_recipes(
+        Recipe.objects.filter(user=request.user), request.GET
+    ).order_by('-id')
+    rows = queryset.values(*list_columns(queryset, columns))
+
+    # the paginator evaluates the page itself; run it the way the async
+    # ORM runs its queries
+    paginator = RecipeCursorPagination()
+    page = await sync_to_async(paginator.paginate_queryset)(
+        rows, Request(request)
+    )
+    related = await related_for([row['id'] for row in page], fields)
+    return {
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': format_rows(page, fields, related),
+    }
+
+
+@async_api_view('recipe', 'retrieve')
+async def recipe_detail(request, pk):
+    """a single recipe, as RecipeDetailSerializer renders it"""
+    fields = readable_fields(RecipeDetailSerializer(
+        context={'request': request}
+    ))
+    columns = source_columns(fields, RELATED)
+    try:
+        row = await Recipe.objects.filter(user=request.user).values(
+            *columns
+        ).aget(pk=pk)
+    except Recipe.DoesNotExist:
+        raise exceptions.NotFound('No Recipe matches the given query.')
+
+    if row.get('image'):
+        # values() returns the stored name, the field renders its url
+        image = Recipe._meta.get_field('image')
+        row['image'] = image.attr_class(None, image, row['image'])
+    related = await related_for([row['id']], fields)
+    return format_rows([row], fields, related)[0]
+
+
+async def attr_list(request, model, serializer_class):
+    try:
+        assigned_only = bool(int(request.GET.get('assigned_only', 0)))
+    except ValueError:
+        raise exceptions.ValidationError(
+            {'assigned_only': 'Must be 0 or 1.'}
+        )
+    queryset = model.objects.filter(user=request.user)
+    if assigned_only:
+        queryset = queryset.filter(recipe__isnull=False)
+    fields = readable_fields(serializer_class())
+    rows = queryset.order_by('-name').distinct().values(*fields)
+    return format_rows([row async for row in rows], fields, {})
+
+
+@async_api_view('tag', 'list')
+async def tag_list(request):
+    return await attr_list(request, Tag, TagSerializer)
+
+
+@async_api_view('ingredient', 'list')
+async def ingredient_list(request):
+    return await attr_list(request, Ingredient, IngredientSerializer)
@@ -0,0 +1,99 @@
+"""
+batch mutations of recipes
+
+a batch is a list of create/patch/delete operations run in a single
+transaction: authentication, the lookup of the targeted recipes and the
+resolution of tag/ingredient names are shared by all its operations.
+Invalid operations are reported in their result and skipped.
+"""
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.fields import empty
+from core.models import Recipe
+from recipe.serializers import RecipeDetailSerializer
+
+OP_CREATE = 'create'
+OP_PATCH = 'patch'
+OP_DELETE = 'delete'
+OPERATIONS = (OP_CREATE, OP_PATCH, OP_DELETE)
+
+ID_FIELD = serializers.IntegerField(min_value=1)
+
+
+def operation_id(operation):
+    """the id targeted by a patch or delete; raises a ValidationError"""
+    return ID_FIELD.run_validation(operation.get('id', empty))
+
+
+class RecipeBatch:
+
+    def __init__(self, user, context):
+        self.user = user
+        self.context = dict(context, resolved_names={})
+        self.instances = {}
+
+    def _load_instances(self, operations):
+        ids = []
+        for op in operations:
+            if isinstance(op, dict) and op.get('op') in (OP_PATCH, OP_DELETE):
+                try:
+                    ids.append(operation_id(op))
+                except serializers.ValidationError:
+                    pass
+        return Recipe.objects.filter(
+            user=self.user, id__in=ids
+        ).prefetch_related('tags', 'ingredients').in_bulk()
+
+    def _create(self, operation, instance):
+        serializer = RecipeDetailSerializer(
+            data=operation.get('data', {}), context=self.context
+        )
+        if not serializer.is_valid():
+            return {'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors}
+        serializer.save(user=self.user)
+        return {'status': status.HTTP_201_CREATED, 'data': serializer.data}
+
+    def _patch(self, operation, instance):
+        serializer = RecipeDetailSerializer(
+            instance, data=operation.get('data', {}), partial=True,
+            context=self.context
+        )
+        if not serializer.is_valid():
+            return {'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors}
+        serializer.save()
+        instance._prefetched_objects_cache = {}
+        return {'status': status.HTTP_200_OK, 'data': serializer.data}
+
+    def _delete(self, operation, instance):
+        del self.instances[instance.id]
+        instance.delete()
+        return {'status': status.HTTP_204_NO_CONTENT}
+
+    def _run_one(self, operation):
+        if not isinstance(operation, dict) or \
+                operation.get('op') not in OPERATIONS:
+            return {'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': {'op': f'Must be one of: '
+                                     f'{", ".join(OPERATIONS)}.'}}
+
+        instance = None
+        if operation['op'] != OP_CREATE:
+            try:
+                pk = operation_id(operation)
+            except serializers.ValidationError as exc:
+                return {'status': status.HTTP_400_BAD_REQUEST,
+                        'errors': {'id': exc.detail}}
+            instance = self.instances.get(pk)
+            if instance is None:
+                return {'status': status.HTTP_404_NOT_FOUND,
+                        'errors': {'id': 'Not found.'}}
+
+        handler = getattr(self, f'_{operation["op"]}')
+        return handler(operation, instance)
+
+    @transaction.atomic
+    def run(self, operations):
+        self.instances = self._load_instances(operations)
+        return [self._run_one(operation) for operation in operations]
@@ -0,0 +1,42 @@
+"""
+set-based helpers for writing many recipes at once
+
+tags and ingredients are resolved by name with one SELECT plus one bulk
+INSERT for the missing ones, and M2M links are written with bulk INSERTs
+on the through tables instead of one query per item
+"""
+
+
+def resolve_by_name(model, user, names, known=None):
+    """
+    map names to ids of user's model rows, creating the missing ones
+
+    known is an optional name -> id dict reused across calls, so a name
+    is only looked up once per import
+    """
+    known = {} if known is None else known
+    missing = sorted({name for name in names if name not in known})
+    if not missing:
+        return known
+
+    existing = model.objects.filter(
+        user=user, name__in=missing
+    ).order_by('id').values_list('name', 'id')
+    for name, pk in existing:
+        known.setdefault(name, pk)
+
+    new_objs = model.objects.bulk_create(
+        [model(user=user, name=name) for name in missing if name not in known]
+    )
+    for obj in new_objs:
+        known[obj.name] = obj.pk
+    return known
+
+
+def link_related(through, column, links):
+    """bulk insert (recipe_id, item_id) pairs into an M2M through table"""
+    through.objects.bulk_create(
+        [through(**{'recipe_id': recipe_id, column: item_id})
+         for recipe_id, item_id in sorted(set(links))],
+        ignore_conflicts=True
+    )
@@ -0,0 +1,137 @@
+"""
+per-user versioned cache for recipe API responses
+
+every cached response is keyed by user, endpoint, normalized query
+params and the user's current version. Writes to a user's recipes, tags
+or ingredients bump the version (see recipe.signals), which makes all of
+their previous entries unreachable; the backend's LRU eviction then
+reclaims them.
+
+The same version doubles as a cheap change marker for ETags, so
+conditional requests are answered without touching the database.
+
+a write served by one worker must reach the version every worker reads,
+so with WEB_WORKERS > 1 the cache has to be shared; on a process-local
+cache the response cache and the ETags are turned off (see
+core.checks).
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from core.checks import is_process_local
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def cache_enabled():
+    """False when workers could not see each other's version bumps"""
+    return settings.RESPONSE_CACHE_TIMEOUT > 0 and (
+        settings.WEB_WORKERS == 1
+        or not is_process_local(settings.RESPONSE_CACHE_ALIAS)
+    )
+
+
+def _version_key(user_id):
+    return f'recipe-api:version:{user_id}'
+
+
+def get_version(user_id):
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # seed with a fresh value rather than 1, so that an evicted
+        # counter can never make stale entries reachable again
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id):
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def normalize_params(query_params):
+    items = sorted(
+        (key, value)
+        for key in query_params
+        for value in query_params.getlist(key)
+    )
+    return urlencode(items)
+
+
+def response_key(request, endpoint):
+    user_id = request.user.pk
+    params = normalize_params(request.query_params)
+    digest = hashlib.md5(
+        f'{request.path}?{params}'.encode()
+    ).hexdigest()
+    return f'recipe-api:{user_id}:{get_version(user_id)}:{endpoint}:{digest}'
+
+
+class CachedListMixin:
+    """cache the serialized list response of a viewset per user"""
+
+    def list(self, request, *args, **kwargs):
+        if not cache_enabled():
+            return super().list(request, *args, **kwargs)
+        cache = get_cache()
+        key = response_key(request, self.basename)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class ETagMixin:
+    """
+    strong ETags for list and retrieve, derived from the user's version
+
+    a matching If-None-Match short-circuits to 304 before the queryset
+    is built. The version moves once a write commits (recipe.signals), so
+    a body read before the commit never carries the ETag of the write
+    """
+
+    def _etag(self, request):
+        key = response_key(request, self.basename)
+        digest = hashlib.md5(
+            f'{key}:{request.accepted_media_type}'.encode()
+        ).hexdigest()
+        return quote_etag(digest)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        if not cache_enabled():
+            return handler(request, *args, **kwargs)
+        etag = self._etag(request)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            if etag in parse_etags(if_none_match):
+                return Response(
+                    status=status.HTTP_304_NOT_MODIFIED,
+                    headers={'ETag': etag}
+                )
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
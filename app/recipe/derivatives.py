@@ -0,0 +1,145 @@
+"""
+background generation of recipe image derivatives
+
+after an upload is committed, WebP copies of the image in the sizes of
+RECIPE_IMAGE_DERIVATIVES are rendered (recipe.imaging) in a pool of
+RECIPE_IMAGE_WORKERS processes, so the decoding and encoding neither
+delays the response nor holds the web worker's GIL. A thread pool of
+the same size waits for each render, stores the files next to the
+original and records their names on the recipe. With
+RECIPE_IMAGE_WORKERS = 0 the derivatives are rendered in the calling
+thread instead.
+
+the executors live in the web process; jobs still queued when it stops
+are lost and are picked up again by the generate_image_derivatives
+command. Spawned workers start sys.executable, which under uWSGI is the
+uwsgi binary unless it runs with --py-sys-executable (scripts/run.sh
+passes the Python interpreter).
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from core.models import Recipe
+from recipe.cache import bump_version
+from recipe.imaging import DERIVATIVE_EXTENSION, render_derivatives
+
+logger = logging.getLogger(__name__)
+
+_executors = None
+_executors_lock = threading.Lock()
+
+
+def get_executors():
+    """(process pool rendering images, threads waiting on it), shared"""
+    global _executors
+    with _executors_lock:
+        if _executors is None:
+            if 'uwsgi' in os.path.basename(sys.executable):
+                raise ImproperlyConfigured(
+                    f'Cannot spawn image workers with {sys.executable}: '
+                    f'start uWSGI with --py-sys-executable pointing at the '
+                    f'Python interpreter, or set RECIPE_IMAGE_WORKERS = 0.'
+                )
+            workers = settings.RECIPE_IMAGE_WORKERS
+            # spawned rather than forked: the workers need Pillow only,
+            # not a copy of the web process and its database connections
+            _executors = (
+                ProcessPoolExecutor(
+                    workers, mp_context=multiprocessing.get_context('spawn')
+                ),
+                ThreadPoolExecutor(
+                    workers, thread_name_prefix='recipe-derivatives'
+                ),
+            )
+        return _executors
+
+
+def render_args(image_name):
+    """arguments of render_derivatives for a stored image"""
+    with default_storage.open(image_name) as image_file:
+        data = image_file.read()
+    return (
+        data, settings.RECIPE_IMAGE_DERIVATIVES, settings.RECIPE_IMAGE_QUALITY
+    )
+
+
+def delete_derivatives(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def record_derivatives(recipe_id, user_id, image_name, rendered):
+    """
+    store rendered derivatives and record them on the recipe, unless its
+    image has been replaced in the meantime; None in that case
+    """
+    root = os.path.splitext(image_name)[0]
+    names = {
+        name: default_storage.save(
+            f'{root}-{name}.{DERIVATIVE_EXTENSION}', ContentFile(data)
+        )
+        for name, data in rendered.items()
+    }
+    # queryset.update skips post_save, so the cached responses of the
+    # user are invalidated here
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=image_name
+    ).update(image_derivatives=names)
+    if not updated:
+        delete_derivatives(names.values())
+        return None
+    bump_version(user_id)
+    return names
+
+
+def generate_derivatives(recipe_id, user_id, image_name):
+    """render and record the derivatives in the calling thread"""
+    rendered = render_derivatives(*render_args(image_name))
+    return record_derivatives(recipe_id, user_id, image_name, rendered)
+
+
+def _generate_in_pool(recipe_id, user_id, image_name):
+    processes, _ = get_executors()
+    try:
+        rendered = processes.submit(
+            render_derivatives, *render_args(image_name)
+        ).result()
+        record_derivatives(recipe_id, user_id, image_name, rendered)
+    finally:
+        # this thread's connections are not closed by a request cycle
+        connections.close_all()
+
+
+def _logged(job, *args):
+    """
+    run job, logging its errors: the recipe keeps serving its original
+    image, and the command can retry later
+    """
+    try:
+        job(*args)
+    except Exception:
+        logger.exception('image derivatives failed for recipe %s', args[0])
+
+
+def _submit(*args):
+    _, threads = get_executors()
+    return threads.submit(_logged, _generate_in_pool, *args)
+
+
+def schedule_derivatives(recipe):
+    """generate the derivatives of recipe.image once the upload commits"""
+    args = (recipe.pk, recipe.user_id, recipe.image.name)
+    if settings.RECIPE_IMAGE_WORKERS:
+        job = partial(_logged, _submit, *args)
+    else:
+        job = partial(_logged, generate_derivatives, *args)
+    transaction.on_commit(job)
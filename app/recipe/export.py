@@ -0,0 +1,77 @@
+"""
+streaming export of a user's recipes
+
+recipes are read in keyset chunks (seeking on id) with tags and
+ingredients prefetched per chunk, so memory stays bounded by the chunk
+size no matter how many recipes are exported
+"""
+import csv
+import json
+from rest_framework.utils.encoders import JSONEncoder
+from recipe.serializers import RecipeDetailSerializer
+
+EXPORT_NDJSON = 'ndjson'
+EXPORT_CSV = 'csv'
+EXPORT_CONTENT_TYPES = {
+    EXPORT_NDJSON: 'application/x-ndjson',
+    EXPORT_CSV: 'text/csv',
+}
+CSV_COLUMNS = ['id', 'title', 'description', 'time_minutes', 'price',
+               'link', 'image', 'tags', 'ingredients']
+
+
+def iter_chunks(queryset, chunk_size):
+    """yield lists of recipes, newest first, chunk_size at a time"""
+    queryset = queryset.prefetch_related(
+        'tags', 'ingredients'
+    ).order_by('-id')
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(
+            id__lt=last_id
+        )
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1].id
+
+
+def iter_rows(queryset, chunk_size, context=None):
+    for chunk in iter_chunks(queryset, chunk_size):
+        yield from RecipeDetailSerializer(
+            chunk, many=True, context=context
+        ).data
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder) + '\n'
+
+
+class _Echo:
+    """file-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        row = dict(row)
+        row['tags'] = '|'.join(tag['name'] for tag in row['tags'])
+        row['ingredients'] = '|'.join(
+            ingredient['name'] for ingredient in row['ingredients']
+        )
+        yield writer.writerow([row[column] for column in CSV_COLUMNS])
+
+
+def export_recipes(queryset, export_format, chunk_size, context=None):
+    rows = iter_rows(queryset, chunk_size, context)
+    if export_format == EXPORT_CSV:
+        return iter_csv(rows)
+    return iter_ndjson(rows)
@@ -0,0 +1,107 @@
+"""
+opt-in fast path for the recipe list
+
+rows are read with .values() and the tags/ingredients of a page are
+fetched with one query per relation into plain dicts, skipping the
+per-object serializer machinery while producing the same output as
+RecipeSerializer. Enabled with the RECIPE_FAST_LIST setting.
+"""
+from collections import defaultdict
+from django.conf import settings
+from core.models import Recipe
+
+
+def _related_rows(through, field, recipe_ids):
+    return through.objects.filter(recipe_id__in=recipe_ids).order_by(
+        f'{field}_id'
+    ).values_list('recipe_id', f'{field}_id', f'{field}__name')
+
+
+def related_by_recipe(through, field, recipe_ids):
+    """{recipe_id: [{'id': ..., 'name': ...}]} ordered by item id"""
+    related = defaultdict(list)
+    for recipe_id, item_id, name in _related_rows(through, field, recipe_ids):
+        related[recipe_id].append({'id': item_id, 'name': name})
+    return related
+
+
+async def arelated_by_recipe(through, field, recipe_ids):
+    """async version of related_by_recipe"""
+    related = defaultdict(list)
+    rows = _related_rows(through, field, recipe_ids)
+    async for recipe_id, item_id, name in rows:
+        related[recipe_id].append({'id': item_id, 'name': name})
+    return related
+
+
+def source_columns(fields, related):
+    """the model columns read by the non-related fields, once each"""
+    return list(dict.fromkeys(
+        field.source for name, field in fields.items() if name not in related
+    ))
+
+
+def list_columns(queryset, columns):
+    """columns plus the ones the cursor paginator positions itself on"""
+    extra = ['id', 'rank', 'price', 'time_minutes', 'title']
+    extra = [
+        name for name in extra if name not in columns
+        and (name != 'rank' or 'rank' in queryset.query.annotations)
+    ]
+    return [*columns, *extra]
+
+
+def format_rows(rows, fields, related):
+    """render .values() rows the way the serializer fields would"""
+    data = []
+    for row in rows:
+        item = {}
+        for name, field in fields.items():
+            if name in related:
+                item[name] = related[name].get(row['id'], [])
+            elif row[field.source] is None:
+                item[name] = None
+            else:
+                item[name] = field.to_representation(row[field.source])
+        data.append(item)
+    return data
+
+
+class FastListMixin:
+    """build the list response from .values() rows instead of objects"""
+
+    def _fast_list_fields(self):
+        requested = self._requested_fields()
+        fields = self.get_serializer_class()(
+            context=self.get_serializer_context()
+        ).fields
+        return {
+            name: field for name, field in fields.items()
+            if not field.write_only
+            and (requested is None or name in requested)
+        }
+
+    def _fast_list_rows(self, fields):
+        columns = source_columns(fields, self.related_fields)
+        queryset = self.get_queryset().prefetch_related(None)
+        return queryset.values(*list_columns(queryset, columns))
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_LIST:
+            return super().list(request, *args, **kwargs)
+
+        fields = self._fast_list_fields()
+        rows = self.paginate_queryset(self._fast_list_rows(fields))
+        recipe_ids = [row['id'] for row in rows]
+        related = {}
+        if 'tags' in fields:
+            related['tags'] = related_by_recipe(
+                Recipe.tags.through, 'tag', recipe_ids
+            )
+        if 'ingredients' in fields:
+            related['ingredients'] = related_by_recipe(
+                Recipe.ingredients.through, 'ingredient', recipe_ids
+            )
+
+        data = format_rows(rows, fields, related)
+        return self.get_paginated_response(data)
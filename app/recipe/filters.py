@@ -0,0 +1,161 @@
+"""
+filters shared by the recipe endpoints
+
+tag and ingredient filters are expressed as semi-joins on the M2M
+through tables, so the recipe query never needs a DISTINCT
+"""
+from decimal import Decimal, InvalidOperation
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, Exists, F, IntegerField, OuterRef
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+from core.models import Recipe
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+# must match the text search configuration used by the trigger that
+# maintains Recipe.search_vector
+SEARCH_CONFIG = 'english'
+# ranks are floats; scale them to integers so that cursor pagination can
+# compare positions exactly
+RANK_SCALE = 1000000
+
+# sort keys accepted by ?ordering=, each one is backed by a
+# (user, field, id) index on core_recipe
+ORDERING_FIELDS = {
+    'id': 'id',
+    'price': 'price',
+    'time': 'time_minutes',
+    'title': 'title',
+}
+
+
+def finite_decimal(value):
+    """Decimal(value), refusing NaN and infinities"""
+    value = Decimal(value)
+    if not value.is_finite():
+        raise ValueError(f'{value} is not a finite number')
+    return value
+
+
+RANGE_FILTERS = {
+    'price_min': ('price__gte', finite_decimal),
+    'price_max': ('price__lte', finite_decimal),
+    'time_min': ('time_minutes__gte', int),
+    'time_max': ('time_minutes__lte', int),
+}
+
+
+def params_to_int(qs):
+    try:
+        return [int(str_id) for str_id in qs.split(",")]
+    except ValueError:
+        raise ValidationError(
+            {'detail': 'Expected a comma separated list of IDs.'}
+        )
+
+
+def get_match_mode(query_params):
+    match = query_params.get('match', MATCH_ANY)
+    if match not in (MATCH_ANY, MATCH_ALL):
+        raise ValidationError(
+            {'match': f'Must be one of: {MATCH_ANY}, {MATCH_ALL}.'}
+        )
+    return match
+
+
+def get_ordering(query_params):
+    """
+    ordering requested with ?ordering=, ties broken on id in the same
+    direction so it matches the index; None when not requested
+    """
+    ordering = query_params.get('ordering')
+    if not ordering:
+        return None
+
+    prefix = '-' if ordering.startswith('-') else ''
+    field = ORDERING_FIELDS.get(ordering[len(prefix):])
+    if field is None:
+        keys = ', '.join(ORDERING_FIELDS)
+        raise ValidationError(
+            {'ordering': f'Must be one of: {keys}, optionally prefixed '
+                         f'by "-".'}
+        )
+    if field == 'id':
+        return (f'{prefix}id',)
+    return (f'{prefix}{field}', f'{prefix}id')
+
+
+def filter_by_range(queryset, query_params):
+    for param, (lookup, cast) in RANGE_FILTERS.items():
+        value = query_params.get(param)
+        if not value:
+            continue
+        try:
+            value = cast(value)
+        except (ValueError, InvalidOperation):
+            raise ValidationError({param: 'Must be a number.'})
+        queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+def filter_by_related(queryset, through, column, ids, match=MATCH_ANY):
+    """
+    keep recipes linked to any (or all) of ids through the M2M table
+    """
+    links = through.objects.filter(**{f'{column}__in': ids})
+    if match == MATCH_ALL:
+        # the through table is unique on (recipe, item), so a recipe has
+        # every requested item exactly when it has len(ids) matching rows
+        having_all = links.values('recipe_id').annotate(
+            matched=Count(column)
+        ).filter(matched=len(set(ids))).values('recipe_id')
+        return queryset.filter(pk__in=having_all)
+
+    return queryset.filter(
+        Exists(links.filter(recipe_id=OuterRef('pk')))
+    )
+
+
+def search_recipes(queryset, term):
+    """
+    full text search on title and description, annotating each recipe
+    with its rank
+    """
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(
+            SearchRank(F('search_vector'), query) * RANK_SCALE,
+            IntegerField()
+        )
+    )
+
+
+def filter_recipes(queryset, query_params):
+    """
+    apply the search/tags/ingredients/match and range query params to
+    queryset
+    """
+    search = query_params.get('search', '').strip()
+    tags = query_params.get('tags')
+    ingredients = query_params.get('ingredients')
+    match = get_match_mode(query_params)
+
+    queryset = filter_by_range(queryset, query_params)
+    if search:
+        queryset = search_recipes(queryset, search)
+
+    if tags:
+        queryset = filter_by_related(
+            queryset, Recipe.tags.through, 'tag_id',
+            params_to_int(tags), match
+        )
+
+    if ingredients:
+        queryset = filter_by_related(
+            queryset, Recipe.ingredients.through, 'ingredient_id',
+            params_to_int(ingredients), match
+        )
+
+    return queryset
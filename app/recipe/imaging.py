@@ -0,0 +1,45 @@
+"""
+resized WebP copies of an image, with Pillow
+
+runs in the worker processes of recipe.derivatives, so this module
+imports nothing from Django: it takes and returns bytes only
+"""
+import io
+from PIL import Image, ImageOps
+
+DERIVATIVE_FORMAT = 'WEBP'
+DERIVATIVE_EXTENSION = 'webp'
+
+
+def _prepared(image):
+    """the upright image in a mode WebP can encode"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def render_derivatives(data, sizes, quality):
+    """
+    {name: WebP bytes} fitting each {name: longest edge} of sizes,
+    keeping the aspect ratio and never upscaling
+    """
+    ordered = sorted(sizes.items(), key=lambda item: item[1], reverse=True)
+    rendered = {}
+    if not ordered:
+        return rendered
+    with Image.open(io.BytesIO(data)) as image:
+        # JPEGs are decoded at the smallest scale still covering the
+        # largest size, which skips most of the decoding work
+        largest = ordered[0][1]
+        image.draft('RGB', (largest, largest))
+        current = _prepared(image)
+        # each size is resized from the previous, larger one
+        for name, edge in ordered:
+            current = current.copy()
+            current.thumbnail((edge, edge), Image.LANCZOS)
+            output = io.BytesIO()
+            current.save(output, DERIVATIVE_FORMAT, quality=quality)
+            rendered[name] = output.getvalue()
+    return rendered
@@ -0,0 +1,136 @@
+"""bulk import of recipes from NDJSON"""
+import json
+from functools import partial
+from django.db import transaction
+from core.models import Recipe, Tag, Ingredient
+from recipe.bulk import resolve_by_name, link_related
+from recipe.cache import bump_version
+from recipe.serializers import RecipeSerializer
+
+
+class RecipeImporter:
+    """
+    import recipes from NDJSON lines in batches
+
+    invalid lines are collected as errors and skipped, the valid ones of
+    every batch are written with a handful of bulk statements. The
+    tag_ids and ingredient_ids of a batch are checked with one query
+    """
+
+    def __init__(self, user, batch_size=500, context=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.context = context or {}
+        self.tag_ids = {}
+        self.ingredient_ids = {}
+        self.created = 0
+        self.errors = []
+
+    def _decode(self, chunk):
+        """(line number, data, error) for each line of the chunk"""
+        decoded = []
+        for line_number, line in chunk:
+            try:
+                decoded.append((line_number, json.loads(line), None))
+            except ValueError as exc:
+                decoded.append((line_number, None, str(exc)))
+        return decoded
+
+    def _owned_ids(self, decoded):
+        """
+        {model: ids of the user's rows} among the tag_ids and
+        ingredient_ids of the chunk, one query per model
+        """
+        owned = {}
+        for model, key in ((Tag, 'tag_ids'), (Ingredient, 'ingredient_ids')):
+            wanted = set()
+            for _, data, _ in decoded:
+                ids = data.get(key) if isinstance(data, dict) else None
+                for value in ids if isinstance(ids, list) else ():
+                    try:
+                        wanted.add(int(value))
+                    except (TypeError, ValueError):
+                        pass
+            owned[model] = set(model.objects.filter(
+                user=self.user, id__in=wanted
+            ).values_list('id', flat=True)) if wanted else set()
+        return owned
+
+    def _parse(self, chunk):
+        """validated data of the valid lines, errors of the others"""
+        decoded = self._decode(chunk)
+        context = dict(self.context, owned_ids=self._owned_ids(decoded))
+        items = []
+        for line_number, data, error in decoded:
+            if error is not None:
+                self.errors.append({'line': line_number, 'errors': error})
+                continue
+            serializer = RecipeSerializer(data=data, context=context)
+            if not serializer.is_valid():
+                self.errors.append(
+                    {'line': line_number, 'errors': serializer.errors}
+                )
+                continue
+            items.append(serializer.validated_data)
+        return items
+
+    def _pop_related(self, batch, model, names_key, ids_key, known):
+        """per item sets of ids, from either names or ids in the line"""
+        names = [
+            [entry['name'] for entry in item.pop(names_key, [])]
+            for item in batch
+        ]
+        resolve_by_name(
+            model, self.user, [name for item in names for name in item],
+            known
+        )
+        return [
+            set(item.pop(ids_key, [])) | {known[name] for name in item_names}
+            for item, item_names in zip(batch, names)
+        ]
+
+    def _write_batch(self, batch):
+        tags = self._pop_related(
+            batch, Tag, 'tags', 'tag_ids', self.tag_ids
+        )
+        ingredients = self._pop_related(
+            batch, Ingredient, 'ingredients', 'ingredient_ids',
+            self.ingredient_ids
+        )
+
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(user=self.user, **item) for item in batch]
+        )
+        link_related(Recipe.tags.through, 'tag_id', [
+            (recipe.id, tag_id)
+            for recipe, ids in zip(recipes, tags) for tag_id in ids
+        ])
+        link_related(Recipe.ingredients.through, 'ingredient_id', [
+            (recipe.id, ingredient_id)
+            for recipe, ids in zip(recipes, ingredients)
+            for ingredient_id in ids
+        ])
+        self.created += len(recipes)
+
+    def _import_chunk(self, chunk):
+        batch = self._parse(chunk)
+        if batch:
+            self._write_batch(batch)
+
+    def run(self, lines):
+        chunk = []
+        with transaction.atomic():
+            for line_number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                chunk.append((line_number, line))
+                if len(chunk) >= self.batch_size:
+                    self._import_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._import_chunk(chunk)
+
+        if self.created:
+            # bulk writes do not send model signals
+            transaction.on_commit(partial(bump_version, self.user.pk))
+        return {'created': self.created, 'errors': self.errors}
@@ -0,0 +1,141 @@
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from urllib import parse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+from recipe.filters import get_ordering
+
+KeysetCursor = namedtuple('KeysetCursor', ['reverse', 'position'])
+
+
+def _value(item, name):
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+def _invert(key):
+    return key[1:] if key.startswith('-') else f'-{key}'
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    keyset pagination for recipes: pages seek on the primary key
+    instead of using OFFSET, so deep pages cost the same as the first
+
+    the cursor holds every value of the ordering, which always ends on
+    id, and the next page starts strictly after that tuple. DRF's cursor
+    keeps the first key plus an offset among the rows sharing it, which
+    repeats pages once more rows than offset_cutoff tie on the key.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = get_ordering(request.query_params)
+        if ordering:
+            return ordering
+        # search results are ranked; ties fall back to the newest recipe
+        if request.query_params.get('search', '').strip():
+            return ('-rank', '-id')
+        return (self.ordering,)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [_invert(key) for key in ordering]
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = self._seek(queryset, ordering, self.cursor.position)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.cursor is not None
+        if self.page:
+            self.first_position = self._position(self.page[0])
+            self.last_position = self._position(self.page[-1])
+        else:
+            position = self.cursor and self.cursor.position
+            self.first_position = self.last_position = position
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def _seek(self, queryset, ordering, position):
+        """rows strictly after position in ordering"""
+        if len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # (a, b) > (x, y) as a >= x AND (a > x OR b > y): the first
+        # condition keeps an index range scan on the leading key
+        after = None
+        for key, value in reversed(list(zip(ordering, position))):
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': value})
+            if after is not None:
+                step = Q(**{f'{name}__{lookup}e': value}) & (
+                    step | after
+                )
+            after = step
+        try:
+            return queryset.filter(after)
+        except (ValueError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _position(self, item):
+        return [str(_value(item, key.lstrip('-'))) for key in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(KeysetCursor(False, self.last_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(KeysetCursor(True, self.first_position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = json.loads(tokens['p'][0])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or not all(
+            isinstance(value, str) for value in position
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return KeysetCursor(reverse, position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': json.dumps(cursor.position)}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
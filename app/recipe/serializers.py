@@ -1,5 +1,11 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from core.models import Recipe, Tag, Ingredient
+from recipe.bulk import resolve_by_name
+from recipe.uploads import CheckedImageField
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -17,51 +23,162 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    accept an optional `fields` argument restricting the rendered fields
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def derivative_url(field, name):
+    """absolute url of a stored derivative when the request is known"""
+    request = field.context.get('request')
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+class DerivativeURLsField(serializers.DictField):
+    """
+    {size name: url} of stored derivatives, rendered from the
+    {size name: storage name} kept on the model
+    """
+    child = serializers.URLField()
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return {
+            size: derivative_url(self, name) for size, name in value.items()
+        }
+
+
+@extend_schema_field(OpenApiTypes.URI)
+class DerivativeURLField(serializers.Field):
+    """url of one derivative size, None until it has been generated"""
+
+    def __init__(self, size, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('source', 'image_derivatives')
+        self.size = size
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        name = value.get(self.size)
+        return None if name is None else derivative_url(self, name)
+
+
+class RecipeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     serializer for recipe
     """
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    # lets lists show images without a detail request per recipe
+    thumbnail = DerivativeURLField('thumbnail')
+    # compact alternative to the nested objects for clients knowing the IDs
+    tag_ids = serializers.ListField(
+        child=serializers.IntegerField(), write_only=True, required=False
+    )
+    ingredient_ids = serializers.ListField(
+        child=serializers.IntegerField(), write_only=True, required=False
+    )
 
     class Meta:
         model = Recipe
         read_only_fields = ["id"]
         fields = ["id", "title", "time_minutes", "price", "link", "tags",
-                  "ingredients"]
-
-    def _get_or_create_tags(self, tags, recipe):
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user=auth_user, **tag)
-            recipe.tags.add(tag_obj)
-
-    def _get_or_create_ingredients(self, ingredients, recipe):
+                  "ingredients", "thumbnail", "tag_ids", "ingredient_ids"]
+
+    def _validate_owned_ids(self, model, ids):
+        ids = set(ids)
+        # bulk imports look up the ids of all their lines at once
+        owned = self.context.get('owned_ids', {}).get(model)
+        if owned is not None:
+            found = ids & owned
+        else:
+            found = set(model.objects.filter(
+                user=self.context['request'].user, id__in=ids
+            ).values_list('id', flat=True))
+        missing = sorted(ids - found)
+        if missing:
+            raise serializers.ValidationError(
+                f'Invalid IDs: {", ".join(map(str, missing))}'
+            )
+        return ids
+
+    def validate_tag_ids(self, value):
+        return self._validate_owned_ids(Tag, value)
+
+    def validate_ingredient_ids(self, value):
+        return self._validate_owned_ids(Ingredient, value)
+
+    def validate(self, attrs):
+        for names_key, ids_key in (('tags', 'tag_ids'),
+                                   ('ingredients', 'ingredient_ids')):
+            if names_key in attrs and ids_key in attrs:
+                raise serializers.ValidationError(
+                    {ids_key: f'Cannot be combined with {names_key}.'}
+                )
+        return attrs
+
+    def _resolve_ids(self, model, items):
         auth_user = self.context['request'].user
-
-        for ingredient in ingredients:
-            obj, created = Ingredient.objects.get_or_create(user=auth_user,
-                                                            **ingredient)
-
-            recipe.ingredients.add(obj)
-
+        # batched writes share the names already resolved by earlier items
+        resolved = self.context.get('resolved_names')
+        known = None if resolved is None else resolved.setdefault(
+            model.__name__, {}
+        )
+        known = resolve_by_name(
+            model, auth_user, [i['name'] for i in items], known
+        )
+        return {known[item['name']] for item in items}
+
+    def _pop_related_ids(self, validated_data, model, names_key, ids_key):
+        """ids to link, given by ID or by name; None when neither is set"""
+        if ids_key in validated_data:
+            return validated_data.pop(ids_key)
+        items = validated_data.pop(names_key, None)
+        if items is None:
+            return None
+        return self._resolve_ids(model, items)
+
+    @transaction.atomic
     def create(self, validated_data):
-        tags = validated_data.pop("tags", [])
-        ingredients = validated_data.pop("ingredients", [])
+        tag_ids = self._pop_related_ids(
+            validated_data, Tag, "tags", "tag_ids"
+        )
+        ingredient_ids = self._pop_related_ids(
+            validated_data, Ingredient, "ingredients", "ingredient_ids"
+        )
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        if tag_ids:
+            recipe.tags.add(*tag_ids)
+        if ingredient_ids:
+            recipe.ingredients.add(*ingredient_ids)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop("tags", None)
-        ingredients = validated_data.pop("ingredients", None)
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+        tag_ids = self._pop_related_ids(
+            validated_data, Tag, "tags", "tag_ids"
+        )
+        ingredient_ids = self._pop_related_ids(
+            validated_data, Ingredient, "ingredients", "ingredient_ids"
+        )
+        # set() diffs against the current links, so only the added and
+        # removed through rows are written
+        if tag_ids is not None:
+            instance.tags.set(tag_ids)
+        if ingredient_ids is not None:
+            instance.ingredients.set(ingredient_ids)
 
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
@@ -71,11 +188,18 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipeDetailSerializer(RecipeSerializer):
+    # empty until the derivatives of a new image have been generated
+    image_derivatives = DerivativeURLsField()
+
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ["description", "image"]
+        fields = RecipeSerializer.Meta.fields + [
+            "description", "image", "image_derivatives"
+        ]
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
+    image = CheckedImageField()
+
     class Meta:
         model = Recipe
         fields = ['id', 'image']
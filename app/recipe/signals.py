@@ -0,0 +1,29 @@
+"""
+invalidate cached recipe API responses when a user's data changes
+
+the version is bumped once the change commits: bumped earlier, a read
+running meanwhile would cache the old rows under the new version
+"""
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import bump_version
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_on_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_version, instance.user_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_on_m2m_change(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(partial(bump_version, instance.user_id))
@@ -0,0 +1,163 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+
+ASYNC_RECIPES_URL = reverse("recipe:async-recipe-list")
+ASYNC_TAGS_URL = reverse("recipe:async-tag-list")
+ASYNC_INGREDIENTS_URL = reverse("recipe:async-ingredient-list")
+
+
+def async_detail_url(recipe_id):
+    return reverse("recipe:async-recipe-detail", args=[recipe_id])
+
+
+def create_user(email="user@example.com", password="testpass123"):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_recipe(user, **params):
+    defaults = {
+        "title": "Sample recipe",
+        "time_minutes": 22,
+        "price": Decimal("5.25"),
+        "description": "Sample description",
+        "link": "http://example.com/recipe.pdf",
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicAsyncAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res["WWW-Authenticate"], "Token")
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        res = self.client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res.json(), {"detail": "Invalid token."})
+
+    def test_inactive_user_rejected(self):
+        user = create_user()
+        token = Token.objects.create(user=user)
+        user.is_active = False
+        user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        res = self.client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAsyncAPITests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.user)
+
+    def _create_tagged_recipes(self, count=3):
+        tag = Tag.objects.create(user=self.user, name="Dinner")
+        ingredient = Ingredient.objects.create(user=self.user, name="Salt")
+        recipes = []
+        for i in range(count):
+            recipe = create_recipe(
+                self.user, title=f"Recipe {i}", price=Decimal(f"{i}.50")
+            )
+            recipe.tags.add(tag)
+            if i % 2:
+                recipe.ingredients.add(ingredient)
+            recipes.append(recipe)
+        return recipes
+
+    def test_recipe_list_matches_sync_endpoint(self):
+        self._create_tagged_recipes()
+        other = create_user(email="other@example.com")
+        create_recipe(other)
+
+        res = self.client.get(ASYNC_RECIPES_URL)
+        sync_res = self.sync_client.get(reverse("recipe:recipe-list"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), sync_res.json())
+        self.assertEqual(len(res.json()["results"]), 3)
+
+    def test_recipe_list_filters_and_pages(self):
+        recipes = self._create_tagged_recipes(5)
+        params = {"ordering": "price", "page_size": 2}
+
+        res = self.client.get(ASYNC_RECIPES_URL, params)
+        sync_res = self.sync_client.get(reverse("recipe:recipe-list"), params)
+
+        self.assertEqual(res.json()["results"], sync_res.json()["results"])
+        self.assertEqual(
+            [r["id"] for r in res.json()["results"]],
+            [recipes[0].id, recipes[1].id]
+        )
+        next_page = self.client.get(res.json()["next"])
+        self.assertEqual(
+            [r["id"] for r in next_page.json()["results"]],
+            [recipes[2].id, recipes[3].id]
+        )
+
+    def test_recipe_list_invalid_filter(self):
+        res = self.client.get(ASYNC_RECIPES_URL, {"tags": "a,b"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_detail_matches_sync_endpoint(self):
+        recipe = self._create_tagged_recipes(2)[1]
+        url = reverse("recipe:recipe-detail", args=[recipe.id])
+
+        res = self.client.get(async_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), self.sync_client.get(url).json())
+
+    def test_recipe_detail_other_user_not_found(self):
+        recipe = create_recipe(create_user(email="other@example.com"))
+
+        res = self.client.get(async_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_and_ingredient_lists_match_sync_endpoints(self):
+        self._create_tagged_recipes()
+        Tag.objects.create(user=self.user, name="Unused")
+
+        for url, sync_url, params in [
+            (ASYNC_TAGS_URL, "recipe:tag-list", {}),
+            (ASYNC_INGREDIENTS_URL, "recipe:ingredient-list", {}),
+            (ASYNC_TAGS_URL, "recipe:tag-list", {"assigned_only": 1}),
+        ]:
+            res = self.client.get(url, params)
+            sync_res = self.sync_client.get(reverse(sync_url), params)
+            self.assertEqual(res.json(), sync_res.json())
+
+    def test_write_methods_not_allowed(self):
+        res = self.client.post(ASYNC_TAGS_URL, {"name": "New"})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertFalse(Tag.objects.filter(name="New").exists())
+
+    async def test_served_over_asgi(self):
+        res = await self.async_client.get(
+            ASYNC_TAGS_URL,
+            headers={"Authorization": f"Token {self.token.key}"},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), [])
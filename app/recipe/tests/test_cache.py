@@ -0,0 +1,283 @@
+import tempfile
+import threading
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {
+        "title": "Parmigiana",
+        "price": Decimal("200.50"),
+        "time_minutes": 30,
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def create_user(email="user@example.com", password="pass1234"):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_recipe_list_served_from_cache(self):
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPES_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+
+    @override_settings(WEB_WORKERS=4)
+    def test_local_cache_not_used_by_several_workers(self):
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertFalse(res.has_header('ETag'))
+
+    @override_settings(
+        WEB_WORKERS=4,
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'response_cache_test',
+        }},
+    )
+    def test_shared_cache_used_by_several_workers(self):
+        call_command('createcachetable', verbosity=0)
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+
+        cached = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH='"x"')
+
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(cached['ETag'], res['ETag'])
+
+    def test_tag_and_ingredient_lists_served_from_cache(self):
+        Tag.objects.create(user=self.user, name="vegan")
+        Ingredient.objects.create(user=self.user, name="salt")
+        for url in (TAGS_URL, INGREDIENTS_URL):
+            res = self.client.get(url)
+            with self.assertNumQueries(0):
+                cached = self.client.get(url)
+            self.assertEqual(cached.data, res.data)
+
+    def test_query_params_are_normalized(self):
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        self.client.get(RECIPES_URL, {'tags': tag.id, 'match': 'all'})
+
+        with self.assertNumQueries(0):
+            self.client.get(RECIPES_URL, {'match': 'all', 'tags': tag.id})
+
+    def test_different_params_not_shared(self):
+        create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'tags': tag.id})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_cache_invalidated_on_recipe_change(self):
+        self.client.get(RECIPES_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 0)
+
+    def test_cache_invalidated_on_m2m_change(self):
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        self.client.get(RECIPES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.add(tag)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'vegan')
+
+    def test_cache_invalidated_on_tag_change(self):
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        self.client.get(TAGS_URL)
+
+        tag.name = "vegetarian"
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data[0]['name'], "vegetarian")
+
+    def test_cache_per_user(self):
+        other = create_user(email="other@example.com")
+        create_recipe(user=other)
+        self.client.get(RECIPES_URL)
+
+        client = APIClient()
+        client.force_authenticate(other)
+        res = client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_other_user_write_keeps_cache(self):
+        other = create_user(email="other@example.com")
+        self.client.get(RECIPES_URL)
+        create_recipe(user=other)
+
+        with self.assertNumQueries(0):
+            self.client.get(RECIPES_URL)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            backend = {
+                'default': {
+                    'BACKEND':
+                        'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': cache_dir,
+                }
+            }
+            with override_settings(CACHES=backend):
+                create_recipe(user=self.user)
+                res = self.client.get(RECIPES_URL)
+                with self.assertNumQueries(0):
+                    cached = self.client.get(RECIPES_URL)
+                self.assertEqual(cached.data, res.data)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    create_recipe(user=self.user, title="Pesto")
+                res = self.client.get(RECIPES_URL)
+                self.assertEqual(len(res.data['results']), 2)
+
+
+class ETagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_list_and_detail_return_etag(self):
+        for url in (RECIPES_URL, detail_url(self.recipe.id)):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertTrue(res.has_header('ETag'))
+
+    def test_if_none_match_returns_304_without_queries(self):
+        for url in (RECIPES_URL, detail_url(self.recipe.id)):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(res['ETag'], etag)
+            self.assertEqual(res.content, b'')
+
+    def test_etag_changes_after_write(self):
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+        self.recipe.title = "Pesto"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['title'], "Pesto")
+
+    def test_etag_depends_on_query_and_media_type(self):
+        etag = self.client.get(RECIPES_URL)['ETag']
+        filtered = self.client.get(RECIPES_URL, {'tags': '1'})
+        browsable = self.client.get(RECIPES_URL, HTTP_ACCEPT='text/html')
+
+        self.assertNotEqual(filtered['ETag'], etag)
+        self.assertNotEqual(browsable['ETag'], etag)
+
+    def test_stale_etag_list(self):
+        etag = self.client.get(RECIPES_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(user=self.user, title="Pesto")
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+
+class CommitOrderTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def _get_meanwhile(self, url, **extra):
+        """GET on another connection, like a request served concurrently"""
+        responses = []
+
+        def get():
+            try:
+                responses.append(self.client.get(url, **extra))
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=get)
+        thread.start()
+        thread.join()
+        return responses[0]
+
+    def test_read_during_write_not_cached_as_current(self):
+        with transaction.atomic():
+            create_recipe(user=self.user)
+            res = self._get_meanwhile(RECIPES_URL)
+            self.assertEqual(res.data['results'], [])
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_etag_read_during_write_revalidated(self):
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        with transaction.atomic():
+            recipe.title = "Pesto"
+            recipe.save()
+            res = self._get_meanwhile(url)
+            self.assertEqual(res.data['title'], "Parmigiana")
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], "Pesto")
@@ -0,0 +1,273 @@
+"""
+tests for the recipe image derivatives
+"""
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from PIL import Image
+from core.models import Recipe
+from recipe import derivatives
+from recipe.imaging import render_derivatives
+
+SIZES = {'thumbnail': 100, 'medium': 400}
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def jpeg_bytes(size=(1600, 1200)):
+    """a JPEG of gradients and noise, compressing roughly like a photo"""
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    image = Image.merge('RGB', (
+        image.getchannel(0), image.getchannel(0).rotate(90, expand=False),
+        Image.effect_noise(size, 40),
+    ))
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+def open_image(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+class RenderDerivativesTests(SimpleTestCase):
+    def test_sizes_keep_aspect_ratio(self):
+        rendered = render_derivatives(jpeg_bytes(), SIZES, 80)
+
+        self.assertEqual(set(rendered), set(SIZES))
+        thumbnail = open_image(rendered['thumbnail'])
+        self.assertEqual(thumbnail.format, 'WEBP')
+        self.assertEqual(thumbnail.size, (100, 75))
+        self.assertEqual(open_image(rendered['medium']).size, (400, 300))
+
+    def test_small_image_not_upscaled(self):
+        rendered = render_derivatives(jpeg_bytes((60, 40)), SIZES, 80)
+
+        self.assertEqual(open_image(rendered['medium']).size, (60, 40))
+
+    def test_thumbnail_order_of_magnitude_smaller(self):
+        original = jpeg_bytes()
+
+        rendered = render_derivatives(original, {'thumbnail': 240}, 80)
+
+        self.assertLess(len(rendered['thumbnail']) * 10, len(original))
+
+    def test_transparency_and_palette_kept_encodable(self):
+        output = io.BytesIO()
+        Image.new('P', (300, 200)).save(output, 'GIF', transparency=0)
+
+        rendered = render_derivatives(output.getvalue(), SIZES, 80)
+
+        self.assertEqual(open_image(rendered['thumbnail']).mode, 'RGBA')
+
+    def test_renders_in_spawned_process(self):
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(1, mp_context=context) as processes:
+            rendered = processes.submit(
+                render_derivatives, jpeg_bytes(), SIZES, 80
+            ).result()
+
+        self.assertEqual(open_image(rendered['thumbnail']).size, (100, 75))
+
+    @mock.patch('recipe.derivatives._executors', None)
+    @mock.patch('sys.executable', '/usr/local/bin/uwsgi')
+    def test_refuses_to_spawn_uwsgi_binary(self):
+        with self.assertRaisesMessage(ImproperlyConfigured,
+                                      '--py-sys-executable'):
+            derivatives.get_executors()
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Parmigiana', time_minutes=40,
+            price=Decimal('8.50')
+        )
+
+    def upload(self, data=None):
+        image = ContentFile(data or jpeg_bytes(), name='photo.jpg')
+        return self.client.post(
+            image_upload_url(self.recipe.id), {'image': image},
+            format='multipart'
+        )
+
+    def assertStored(self, names):
+        storage = derivatives.default_storage
+        for name in names:
+            self.assertTrue(storage.exists(name), name)
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0, RECIPE_IMAGE_DERIVATIVES=SIZES)
+class UploadDerivativesTests(MediaRootMixin, TestCase):
+    def test_upload_generates_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.upload()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.recipe.refresh_from_db()
+        names = self.recipe.image_derivatives
+        self.assertEqual(set(names), set(SIZES))
+        self.assertStored(names.values())
+        self.assertTrue(names['thumbnail'].endswith('-thumbnail.webp'))
+
+    def test_detail_exposes_derivative_urls(self):
+        self.assertEqual(
+            self.client.get(detail_url(self.recipe.id)).data[
+                'image_derivatives'
+            ], {}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        urls = res.data['image_derivatives']
+        self.assertEqual(set(urls), set(SIZES))
+        self.assertTrue(urls['thumbnail'].startswith('http://testserver/'))
+        self.assertTrue(urls['thumbnail'].endswith('-thumbnail.webp'))
+
+    def test_list_exposes_thumbnail_url(self):
+        self.assertIsNone(
+            self.client.get(RECIPES_URL).data['results'][0]['thumbnail']
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+        self.recipe.refresh_from_db()
+        expected = 'http://testserver' + derivatives.default_storage.url(
+            self.recipe.image_derivatives['thumbnail']
+        )
+
+        for fast_list in (False, True):
+            with override_settings(RECIPE_FAST_LIST=fast_list):
+                res = self.client.get(RECIPES_URL)
+                sparse = self.client.get(
+                    RECIPES_URL, {'fields': 'id,thumbnail'}
+                )
+
+            self.assertEqual(res.data['results'][0]['thumbnail'], expected)
+            self.assertEqual(sparse.data['results'][0],
+                             {'id': self.recipe.id, 'thumbnail': expected})
+
+    def test_new_upload_replaces_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+        self.recipe.refresh_from_db()
+        stale = self.recipe.image_derivatives
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+
+        self.recipe.refresh_from_db()
+        self.assertStored(self.recipe.image_derivatives.values())
+        for name in stale.values():
+            self.assertFalse(derivatives.default_storage.exists(name))
+
+    def test_derivatives_of_replaced_image_discarded(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.upload()
+        first = Recipe.objects.get(pk=self.recipe.pk).image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload()
+        current = Recipe.objects.get(pk=self.recipe.pk).image_derivatives
+
+        # the job of the first upload finishes last
+        callbacks[-1]()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_derivatives, current)
+        self.assertFalse(any(
+            name.startswith(os.path.splitext(first)[0])
+            for name in current.values()
+        ))
+
+    def test_failed_render_keeps_upload(self):
+        with self.assertLogs('recipe.derivatives', 'ERROR'), \
+                mock.patch('recipe.derivatives.render_derivatives',
+                           side_effect=OSError('truncated image')), \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_derivatives, {})
+
+    @override_settings(RECIPE_IMAGE_WORKERS=1)
+    @mock.patch('recipe.derivatives._executors', None)
+    @mock.patch('sys.executable', '/usr/local/bin/uwsgi')
+    def test_misconfigured_pool_logged_upload_kept(self):
+        with self.assertLogs('recipe.derivatives', 'ERROR') as logs, \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('--py-sys-executable', logs.output[0])
+
+    def test_command_generates_missing_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            self.upload()
+
+        call_command(
+            'generate_image_derivatives', '--workers', '1',
+            stdout=io.StringIO()
+        )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(set(self.recipe.image_derivatives), set(SIZES))
+        self.assertStored(self.recipe.image_derivatives.values())
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=1, RECIPE_IMAGE_DERIVATIVES=SIZES)
+class BackgroundDerivativesTests(MediaRootMixin, TransactionTestCase):
+    def test_upload_rendered_in_process_pool(self):
+        res = self.upload()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            self.recipe.refresh_from_db()
+            if self.recipe.image_derivatives:
+                break
+            time.sleep(0.05)
+
+        self.assertEqual(set(self.recipe.image_derivatives), set(SIZES))
+        self.assertStored(self.recipe.image_derivatives.values())
@@ -0,0 +1,88 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+
+FACETS_URL = reverse("recipe:facets")
+
+
+def create_recipe(user, **params):
+    defaults = {
+        "title": "Parmigiana",
+        "price": Decimal("200.50"),
+        "time_minutes": 30,
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def create_user(email="user@example.com", password="pass1234"):
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class PublicFacetsAPITests(TestCase):
+    def test_auth_required(self):
+        res = APIClient().get(FACETS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateFacetsAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name="vegan")
+        self.dinner = Tag.objects.create(user=self.user, name="dinner")
+        self.pasta = Ingredient.objects.create(user=self.user, name="pasta")
+        self.r1 = create_recipe(user=self.user, title="Pasta e fagioli")
+        self.r2 = create_recipe(user=self.user, title="Pasta al pesto")
+        self.r3 = create_recipe(user=self.user, title="Insalata")
+        self.r1.tags.add(self.vegan, self.dinner)
+        self.r2.tags.add(self.dinner)
+        self.r3.tags.add(self.vegan)
+        self.r1.ingredients.add(self.pasta)
+        self.r2.ingredients.add(self.pasta)
+
+    def test_facet_counts(self):
+        with self.assertNumQueries(2):
+            res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'], [
+            {'id': self.vegan.id, 'name': 'vegan', 'count': 2},
+            {'id': self.dinner.id, 'name': 'dinner', 'count': 2},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': self.pasta.id, 'name': 'pasta', 'count': 2},
+        ])
+
+    def test_facet_counts_with_filters(self):
+        res = self.client.get(FACETS_URL, {'ingredients': self.pasta.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        counts = {t['name']: t['count'] for t in res.data['tags']}
+        self.assertEqual(counts, {'vegan': 1, 'dinner': 2})
+
+    def test_facet_counts_match_all(self):
+        params = {
+            'tags': f'{self.vegan.id},{self.dinner.id}',
+            'match': 'all',
+        }
+        res = self.client.get(FACETS_URL, params)
+
+        counts = {t['name']: t['count'] for t in res.data['tags']}
+        self.assertEqual(counts, {'vegan': 1, 'dinner': 1})
+
+    def test_facet_counts_limited_to_user(self):
+        other = create_user(email="other@example.com")
+        recipe = create_recipe(user=other)
+        recipe.tags.add(Tag.objects.create(user=other, name="secret"))
+
+        res = self.client.get(FACETS_URL)
+
+        names = [t['name'] for t in res.data['tags']]
+        self.assertNotIn('secret', names)
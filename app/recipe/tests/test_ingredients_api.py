@@ -8,6 +8,7 @@ from recipe.serializers import IngredientSerializer
 from decimal import Decimal
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
 
 
 def detail_url(ingredient_id):
@@ -114,3 +115,14 @@ class PrivateIngredientsAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(len(res.data), 1)
 
+    def test_autocomplete_ingredients(self):
+        Ingredient.objects.create(user=self.user, name="Pasta")
+        Ingredient.objects.create(user=self.user, name="pancetta")
+        Ingredient.objects.create(user=self.user, name="uova")
+        other = create_user(email="other@example.com")
+        Ingredient.objects.create(user=other, name="pane")
+
+        res = self.client.get(INGREDIENTS_AUTOCOMPLETE_URL, {'q': 'pa'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([i['name'] for i in res.data], ['pancetta', 'Pasta'])
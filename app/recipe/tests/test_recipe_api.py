@@ -1,16 +1,28 @@
 from decimal import Decimal
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+import csv
+import io
+import json
+import msgpack
 import os
 import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
 from PIL import Image
 
 RECIPES_URL = reverse("recipe:recipe-list")
+EXPORT_URL = reverse("recipe:recipe-export")
+IMPORT_URL = reverse("recipe:recipe-bulk-import")
+BATCH_URL = reverse("recipe:recipe-batch")
 
 
 def detail_url(recipe_id):
@@ -62,7 +74,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_auth_user(self):
         other_user = create_user(email="other@example.com",
@@ -76,7 +88,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_detail(self):
         recipe = create_recipe(user=self.user)
@@ -346,9 +358,9 @@ class PrivateRecipeAPITests(TestCase):
         res = self.client.get(RECIPES_URL, params)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(RecipeSerializer(r1).data, res.data)
-        self.assertIn(RecipeSerializer(r2).data, res.data)
-        self.assertNotIn(RecipeSerializer(r3).data, res.data)
+        self.assertIn(RecipeSerializer(r1).data, res.data['results'])
+        self.assertIn(RecipeSerializer(r2).data, res.data['results'])
+        self.assertNotIn(RecipeSerializer(r3).data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         r1 = create_recipe(user=self.user, title="Vegetable curry")
@@ -363,9 +375,792 @@ class PrivateRecipeAPITests(TestCase):
         res = self.client.get(RECIPES_URL, params)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(RecipeSerializer(r1).data, res.data)
-        self.assertIn(RecipeSerializer(r2).data, res.data)
-        self.assertNotIn(RecipeSerializer(r3).data, res.data)
+        self.assertIn(RecipeSerializer(r1).data, res.data['results'])
+        self.assertIn(RecipeSerializer(r2).data, res.data['results'])
+        self.assertNotIn(RecipeSerializer(r3).data, res.data['results'])
+
+    def _create_tagged_recipes(self, count):
+        tag = Tag.objects.create(user=self.user, name="secondo")
+        ingredient = Ingredient.objects.create(user=self.user, name="Pasta")
+        recipes = []
+        for i in range(count):
+            recipe = create_recipe(user=self.user, title=f"Recipe {i}")
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+            recipes.append(recipe)
+        return recipes, tag, ingredient
+
+    def test_list_recipes_query_count(self):
+        self._create_tagged_recipes(5)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_recipe_detail_query_count(self):
+        recipes, _, _ = self._create_tagged_recipes(1)
+        url = detail_url(recipes[0].id)
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertEqual(len(res.data['ingredients']), 1)
+
+    def test_filter_recipes_query_count(self):
+        _, tag, ingredient = self._create_tagged_recipes(5)
+        params = {'tags': f'{tag.id}', 'ingredients': f'{ingredient.id}'}
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_list_recipes_cursor_pagination(self):
+        recipes = [
+            create_recipe(user=self.user, title=f"Recipe {i}")
+            for i in range(5)
+        ]
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+
+        ids = [r['id'] for r in res.data['results']]
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIsNotNone(res.data['previous'])
+            ids += [r['id'] for r in res.data['results']]
+            next_url = res.data['next']
+
+        expected = sorted([r.id for r in recipes], reverse=True)
+        self.assertEqual(ids, expected)
+
+    def test_cursor_pagination_with_filters(self):
+        tag = Tag.objects.create(user=self.user, name="secondo")
+        tagged = []
+        for i in range(4):
+            recipe = create_recipe(user=self.user, title=f"Recipe {i}")
+            if i % 2 == 0:
+                recipe.tags.add(tag)
+                tagged.append(recipe.id)
+
+        res = self.client.get(RECIPES_URL, {'tags': tag.id, 'page_size': 1})
+        ids = [r['id'] for r in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [r['id'] for r in res.data['results']]
+
+        self.assertIsNone(res.data['next'])
+        self.assertEqual(ids, sorted(tagged, reverse=True))
+
+    def test_filter_by_tags_no_duplicates(self):
+        recipe = create_recipe(user=self.user)
+        t1 = Tag.objects.create(user=self.user, name="secondo")
+        t2 = Tag.objects.create(user=self.user, name="dessert")
+        recipe.tags.add(t1, t2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{t1.id},{t2.id}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_by_tags_match_all(self):
+        r1 = create_recipe(user=self.user, title="Vegetable curry")
+        r2 = create_recipe(user=self.user, title="7 veli")
+        t1 = Tag.objects.create(user=self.user, name="secondo")
+        t2 = Tag.objects.create(user=self.user, name="dessert")
+        r1.tags.add(t1, t2)
+        r2.tags.add(t1)
+
+        params = {'tags': f'{t1.id},{t2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(RecipeSerializer(r1).data, res.data['results'])
+        self.assertNotIn(RecipeSerializer(r2).data, res.data['results'])
+
+    def test_filter_by_ingredients_match_all(self):
+        r1 = create_recipe(user=self.user, title="Vegetable curry")
+        r2 = create_recipe(user=self.user, title="7 veli")
+        i1 = Ingredient.objects.create(user=self.user, name="Broccoli")
+        i2 = Ingredient.objects.create(user=self.user, name="Zucchero")
+        r1.ingredients.add(i1, i2)
+        r2.ingredients.add(i2)
+
+        params = {'ingredients': f'{i1.id},{i2.id},{i1.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [r1.id]
+        )
+
+    def test_filter_invalid_match_mode(self):
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_sparse_fields(self):
+        self._create_tagged_recipes(3)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('"price"', ctx.captured_queries[0]['sql'])
+        for recipe in res.data['results']:
+            self.assertEqual(set(recipe), {'id', 'title'})
+
+    def test_list_sparse_fields_with_related(self):
+        self._create_tagged_recipes(3)
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL, {'fields': 'title,tags'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in res.data['results']:
+            self.assertEqual(set(recipe), {'title', 'tags'})
+            self.assertEqual(recipe['tags'][0]['name'], 'secondo')
+
+    def test_detail_sparse_fields_skip_large_columns(self):
+        recipe = create_recipe(user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(detail_url(recipe.id), {'fields': 'title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'title': recipe.title})
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('"description"', ctx.captured_queries[0]['sql'])
+        self.assertNotIn('"image"', ctx.captured_queries[0]['sql'])
+
+    def test_search_vector_not_loaded(self):
+        create_recipe(user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL)
+            self.client.get(detail_url(Recipe.objects.get().id))
+
+        for query in ctx.captured_queries:
+            self.assertNotIn('"search_vector"', query['sql'])
+
+    def test_sparse_fields_unknown_field(self):
+        res = self.client.get(RECIPES_URL, {'fields': 'id,description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        r1 = create_recipe(user=self.user, title="Pasta with tomatoes",
+                           description="")
+        r2 = create_recipe(user=self.user, title="Parmigiana",
+                           description="Fry the tomatoes")
+        create_recipe(user=self.user, title="Tiramisu", description="")
+
+        res = self.client.get(RECIPES_URL, {'search': 'tomato'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [r['id'] for r in res.data['results']]
+        self.assertEqual(ids, [r1.id, r2.id])
+
+    def test_search_with_tags(self):
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        r1 = create_recipe(user=self.user, title="Tomato soup")
+        create_recipe(user=self.user, title="Tomato salad")
+        r1.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL, {'search': 'tomato',
+                                            'tags': tag.id})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [r1.id])
+
+    def test_search_vector_updated_on_bulk_update(self):
+        recipe = create_recipe(user=self.user, title="Pesto")
+        Recipe.objects.filter(id=recipe.id).update(title="Carbonara")
+
+        res = self.client.get(RECIPES_URL, {'search': 'carbonara'})
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+    def test_search_pagination(self):
+        recipes = [
+            create_recipe(user=self.user, title=f"Tomato soup {i}")
+            for i in range(3)
+        ]
+        res = self.client.get(RECIPES_URL, {'search': 'tomato',
+                                            'page_size': 2})
+        ids = [r['id'] for r in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [r['id'] for r in res.data['results']]
+
+        self.assertIsNone(res.data['next'])
+        self.assertEqual(ids, sorted([r.id for r in recipes], reverse=True))
+
+    def test_export_ndjson(self):
+        recipes, _, _ = self._create_tagged_recipes(3)
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([r['id'] for r in rows],
+                         sorted([r.id for r in recipes], reverse=True))
+        self.assertEqual(rows[0]['tags'], [{'id': recipes[0].tags.get().id,
+                                            'name': 'secondo'}])
+        self.assertEqual(rows[0]['price'], '200.50')
+
+    def test_export_csv(self):
+        self._create_tagged_recipes(2)
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['tags'], 'secondo')
+        self.assertEqual(rows[0]['ingredients'], 'Pasta')
+
+    @patch('recipe.views.RecipeViewSet.export_chunk_size', 2)
+    def test_export_batches_related_per_chunk(self):
+        self._create_tagged_recipes(5)
+        res = self.client.get(EXPORT_URL)
+
+        with self.assertNumQueries(9):
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+
+    def test_export_filtered(self):
+        _, tag, _ = self._create_tagged_recipes(2)
+        create_recipe(user=self.user, title="Untagged")
+        res = self.client.get(EXPORT_URL, {'tags': tag.id})
+
+        lines = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(len(lines), 2)
+
+    def test_export_invalid_format(self):
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _post_ndjson(self, items):
+        body = "\n".join(
+            item if isinstance(item, str) else json.dumps(item)
+            for item in items
+        )
+        return self.client.post(IMPORT_URL, body,
+                                content_type='application/x-ndjson')
+
+    def test_bulk_import(self):
+        existing = Tag.objects.create(user=self.user, name="vegan")
+        items = [
+            {"title": "Pasta e fagioli", "time_minutes": 40, "price": "5.00",
+             "tags": [{"name": "vegan"}, {"name": "dinner"}],
+             "ingredients": [{"name": "pasta"}, {"name": "fagioli"}]},
+            {"title": "Pasta al pesto", "time_minutes": 15, "price": "4.50",
+             "tags": [{"name": "dinner"}],
+             "ingredients": [{"name": "pasta"}]},
+        ]
+        res = self._post_ndjson(items)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'created': 2, 'errors': []})
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(recipes.count(), 2)
+        self.assertEqual(
+            set(recipes[0].tags.values_list('name', flat=True)),
+            {'vegan', 'dinner'}
+        )
+        self.assertIn(existing, recipes[0].tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2
+        )
+        self.assertEqual(recipes[1].ingredients.get().name, 'pasta')
+
+    def test_bulk_import_reports_line_errors(self):
+        items = [
+            {"title": "Ok", "time_minutes": 10, "price": "1.00"},
+            "not json",
+            {"title": "No price", "time_minutes": 10},
+            "",
+            {"title": "Ok too", "time_minutes": 10, "price": "1.00"},
+        ]
+        res = self._post_ndjson(items)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual([e['line'] for e in res.data['errors']], [2, 3])
+        self.assertIn('price', res.data['errors'][1]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_import_set_based_queries(self):
+        items = [
+            {"title": f"Recipe {i}", "time_minutes": 10, "price": "1.00",
+             "tags": [{"name": f"tag {j}"} for j in range(10)],
+             "ingredients": [{"name": f"ingr {j}"} for j in range(10)]}
+            for i in range(20)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self._post_ndjson(items)
+
+        self.assertEqual(res.data['created'], 20)
+        self.assertLessEqual(len(ctx.captured_queries), 12)
+        self.assertEqual(Recipe.tags.through.objects.filter(
+            recipe__user=self.user).count(), 200)
+
+    def test_bulk_import_invalidates_list_cache(self):
+        self.client.get(RECIPES_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post_ndjson(
+                [{"title": "Ok", "time_minutes": 10, "price": "1.00"}]
+            )
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_create_recipe_with_many_tags_query_count(self):
+        Tag.objects.create(user=self.user, name="tag 0")
+        payload = {
+            "title": "Chicken curry",
+            "time_minutes": 10,
+            "price": Decimal("5.00"),
+            "tags": [{"name": f"tag {i}"} for i in range(30)],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertLessEqual(len(ctx.captured_queries), 12)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_update_unchanged_tags_writes_nothing(self):
+        recipe = create_recipe(user=self.user)
+        tags = [Tag.objects.create(user=self.user, name=f"tag {i}")
+                for i in range(5)]
+        recipe.tags.add(*tags)
+        payload = {'tags': [{'name': tag.name} for tag in tags]}
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), payload,
+                                    format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            q['sql'] for q in ctx.captured_queries
+            if 'core_recipe_tags' in q['sql']
+            and q['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(recipe.tags.count(), 5)
+
+    def test_update_tags_diff(self):
+        recipe = create_recipe(user=self.user)
+        keep = Tag.objects.create(user=self.user, name="keep")
+        drop = Tag.objects.create(user=self.user, name="drop")
+        recipe.tags.add(keep, drop)
+        payload = {'tags': [{'name': 'keep'}, {'name': 'new'}]}
+
+        res = self.client.patch(detail_url(recipe.id), payload,
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(t['name'] for t in res.data['tags']), ['keep', 'new']
+        )
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)), {'keep', 'new'}
+        )
+
+    def test_batch_operations(self):
+        to_patch = create_recipe(user=self.user, title="Old title")
+        to_delete = create_recipe(user=self.user)
+        payload = {'operations': [
+            {'op': 'create', 'data': {
+                'title': 'Pesto', 'time_minutes': 10, 'price': '3.00',
+                'tags': [{'name': 'vegan'}]}},
+            {'op': 'patch', 'id': to_patch.id, 'data': {
+                'title': 'New title', 'tags': [{'name': 'vegan'}]}},
+            {'op': 'delete', 'id': to_delete.id},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual([r['status'] for r in results], [201, 200, 204])
+        self.assertEqual(results[0]['data']['tags'][0]['name'], 'vegan')
+        to_patch.refresh_from_db()
+        self.assertEqual(to_patch.title, 'New title')
+        self.assertFalse(Recipe.objects.filter(id=to_delete.id).exists())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_batch_reports_failed_operations(self):
+        other = create_user(email="other@example.com", password="pass123")
+        foreign = create_recipe(user=other)
+        recipe = create_recipe(user=self.user)
+        payload = {'operations': [
+            {'op': 'create', 'data': {'title': 'No price'}},
+            {'op': 'patch', 'id': foreign.id, 'data': {'title': 'Mine'}},
+            {'op': 'upsert', 'id': recipe.id},
+            {'op': 'delete', 'id': recipe.id},
+            {'op': 'patch', 'id': recipe.id, 'data': {'title': 'Gone'}},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in res.data['results']],
+                         [400, 404, 400, 204, 404])
+        foreign.refresh_from_db()
+        self.assertNotEqual(foreign.title, 'Mine')
+
+    def test_batch_rejects_invalid_ids(self):
+        recipe = create_recipe(user=self.user)
+        payload = {'operations': [
+            {'op': 'delete', 'id': [recipe.id]},
+            {'op': 'patch', 'id': {'pk': recipe.id}, 'data': {}},
+            {'op': 'delete', 'id': True},
+            {'op': 'delete'},
+            {'op': 'patch', 'id': str(recipe.id), 'data': {'title': 'New'}},
+        ]}
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual([r['status'] for r in results],
+                         [400, 400, 400, 400, 200])
+        self.assertIn('id', results[0]['errors'])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_batch_shares_name_resolution(self):
+        payload = {'operations': [
+            {'op': 'create', 'data': {
+                'title': f'Recipe {i}', 'time_minutes': 10, 'price': '3.00',
+                'tags': [{'name': 'vegan'}, {'name': 'dinner'}]}}
+            for i in range(10)
+        ]}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag_selects = [q for q in ctx.captured_queries
+                       if q['sql'].startswith('SELECT "core_tag"."name"')]
+        self.assertEqual(len(tag_selects), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_batch_invalid_body(self):
+        res = self.client.post(BATCH_URL, {'operations': 'x'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload = {'operations': [{'op': 'delete', 'id': 1}] * 101}
+        res = self.client.post(BATCH_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_recipe_with_tag_and_ingredient_ids(self):
+        tags = [Tag.objects.create(user=self.user, name=f"tag {i}")
+                for i in range(3)]
+        ingredient = Ingredient.objects.create(user=self.user, name="pasta")
+        payload = {
+            "title": "Pasta",
+            "time_minutes": 10,
+            "price": Decimal("5.00"),
+            "tag_ids": [tag.id for tag in tags],
+            "ingredient_ids": [ingredient.id],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('tag_ids', res.data)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(set(recipe.tags.all()), set(tags))
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_update_recipe_tag_ids(self):
+        keep = Tag.objects.create(user=self.user, name="keep")
+        drop = Tag.objects.create(user=self.user, name="drop")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(keep, drop)
+
+        res = self.client.patch(detail_url(recipe.id), {'tag_ids': [keep.id]},
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.tags.all()), [keep])
+
+    def test_tag_ids_validated_in_one_query(self):
+        tags = [Tag.objects.create(user=self.user, name=f"tag {i}")
+                for i in range(10)]
+        serializer = RecipeSerializer(
+            data={'title': 'Pasta', 'time_minutes': 10, 'price': '5.00',
+                  'tag_ids': [tag.id for tag in tags]},
+            context={'request': SimpleNamespace(user=self.user)}
+        )
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+    def test_tag_ids_of_other_user_rejected(self):
+        other = create_user(email="other@example.com", password="pass123")
+        foreign = Tag.objects.create(user=other, name="secret")
+        payload = {"title": "Pasta", "time_minutes": 10, "price": "5.00",
+                   "tag_ids": [foreign.id]}
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_ids', res.data)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_tags_and_tag_ids_exclusive(self):
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        payload = {"title": "Pasta", "time_minutes": 10, "price": "5.00",
+                   "tags": [{"name": "vegan"}], "tag_ids": [tag.id]}
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_import_with_ids(self):
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        res = self._post_ndjson([
+            {"title": "Ok", "time_minutes": 10, "price": "1.00",
+             "tag_ids": [tag.id], "ingredients": [{"name": "salt"}]},
+        ])
+
+        self.assertEqual(res.data, {'created': 1, 'errors': []})
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(recipe.ingredients.get().name, 'salt')
+
+    def test_bulk_import_checks_ids_once_per_batch(self):
+        other = create_user(email="other@example.com", password="pass123")
+        foreign = Tag.objects.create(user=other, name="foreign")
+        tags = [Tag.objects.create(user=self.user, name=f"tag {i}")
+                for i in range(3)]
+        ingredient = Ingredient.objects.create(user=self.user, name="salt")
+        items = [
+            {"title": f"Recipe {i}", "time_minutes": 10, "price": "1.00",
+             "tag_ids": [tags[i % 3].id], "ingredient_ids": [ingredient.id]}
+            for i in range(30)
+        ] + [{"title": "Foreign", "time_minutes": 10, "price": "1.00",
+              "tag_ids": [foreign.id]}]
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self._post_ndjson(items)
+
+        self.assertEqual(res.data['created'], 30)
+        self.assertEqual([e['line'] for e in res.data['errors']], [31])
+        self.assertIn('tag_ids', res.data['errors'][0]['errors'])
+        id_checks = [q for q in ctx.captured_queries
+                     if q['sql'].startswith('SELECT "core_tag"."id"')]
+        self.assertEqual(len(id_checks), 1)
+
+    def test_filter_price_and_time_range(self):
+        r1 = create_recipe(user=self.user, price=Decimal("5.00"),
+                           time_minutes=10)
+        create_recipe(user=self.user, price=Decimal("15.00"),
+                      time_minutes=10)
+        create_recipe(user=self.user, price=Decimal("5.00"),
+                      time_minutes=90)
+        params = {'price_min': '1', 'price_max': '10.50',
+                  'time_min': 5, 'time_max': 30}
+
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data['results']], [r1.id])
+
+    def test_filter_range_invalid(self):
+        res = self.client.get(RECIPES_URL, {'price_min': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price_min', res.data)
+
+    def test_filter_range_not_finite(self):
+        for value in ('NaN', 'sNaN', 'Infinity', '-inf'):
+            res = self.client.get(RECIPES_URL, {'price_max': value})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('price_max', res.data)
+
+    def test_ordering_paginates_across_ties(self):
+        prices = ["3.00", "1.00", "2.00", "1.00", "3.00"]
+        recipes = [create_recipe(user=self.user, price=Decimal(p))
+                   for p in prices]
+
+        ids = []
+        res = self.client.get(RECIPES_URL, {'ordering': 'price',
+                                            'page_size': 2})
+        while True:
+            ids += [r['id'] for r in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        expected = [r.id for r in sorted(recipes,
+                                         key=lambda r: (r.price, r.id))]
+        self.assertEqual(ids, expected)
+
+    def test_ordering_paginates_ties_past_offset_cutoff(self):
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f"Recipe {i}", time_minutes=10,
+                   price=Decimal("5.00"))
+            for i in range(1200)
+        ])
+
+        ids = []
+        res = self.client.get(RECIPES_URL, {'ordering': 'time',
+                                            'page_size': 500,
+                                            'fields': 'id'})
+        while True:
+            ids += [r['id'] for r in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(ids, sorted(
+            Recipe.objects.filter(user=self.user).values_list('id', flat=True)
+        ))
+
+    def test_ordering_previous_page_across_ties(self):
+        recipes = [create_recipe(user=self.user, price=Decimal("2.00"))
+                   for _ in range(5)]
+        res = self.client.get(RECIPES_URL, {'ordering': '-price',
+                                            'page_size': 2})
+        first = [r['id'] for r in res.data['results']]
+
+        res = self.client.get(self.client.get(res.data['next']).data[
+            'previous'
+        ])
+
+        self.assertEqual([r['id'] for r in res.data['results']], first)
+        self.assertEqual(first, [recipes[4].id, recipes[3].id])
+        self.assertIsNone(res.data['previous'])
+
+    def test_invalid_cursor_not_found(self):
+        res = self.client.get(RECIPES_URL, {'cursor': 'bm90IGEgY3Vyc29y'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_ordering_descending_time(self):
+        r1 = create_recipe(user=self.user, time_minutes=10)
+        r2 = create_recipe(user=self.user, time_minutes=30)
+
+        res = self.client.get(RECIPES_URL, {'ordering': '-time'})
+
+        self.assertEqual([r['id'] for r in res.data['results']],
+                         [r2.id, r1.id])
+
+    def test_ordering_unindexed_key_rejected(self):
+        res = self.client.get(RECIPES_URL, {'ordering': 'description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', res.data)
+
+    def test_ordering_with_fields_reads_sort_key_once(self):
+        for price in ["3.00", "1.00", "2.00", "1.00", "3.00"]:
+            create_recipe(user=self.user, price=Decimal(price))
+        params = {'fields': 'id,title', 'ordering': 'price', 'page_size': 3}
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertEqual(set(res.data['results'][0]), {'id', 'title'})
+
+    def test_ordering_uses_index(self):
+        create_recipe(user=self.user)
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+            cursor.execute(
+                "EXPLAIN SELECT id FROM core_recipe WHERE user_id = %s "
+                "AND price >= 1 ORDER BY price, id LIMIT 10",
+                [self.user.id]
+            )
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            cursor.execute("RESET enable_seqscan")
+
+        self.assertIn("recipe_user_price_idx", plan)
+        self.assertNotIn("Sort", plan)
+
+    def _list_both_paths(self, params=None):
+        responses = []
+        for fast in (False, True):
+            cache.clear()
+            with self.settings(RECIPE_FAST_LIST=fast):
+                responses.append(self.client.get(RECIPES_URL, params))
+        return responses
+
+    def _create_mixed_recipes(self):
+        tags = [Tag.objects.create(user=self.user, name=f"tag {i}")
+                for i in range(3)]
+        ingredient = Ingredient.objects.create(user=self.user, name="salt")
+        for i in range(5):
+            recipe = create_recipe(user=self.user, title=f"Soup {i}",
+                                   price=Decimal(f"{i}.5"), link="")
+            recipe.tags.add(*tags[:i])
+            if i % 2:
+                recipe.ingredients.add(ingredient)
+        return tags
+
+    def test_fast_list_byte_identical(self):
+        tags = self._create_mixed_recipes()
+        params_list = [
+            None,
+            {'page_size': 2},
+            {'fields': 'title,tags,price'},
+            {'ordering': '-price'},
+            {'search': 'soup', 'tags': tags[0].id},
+        ]
+        for params in params_list:
+            slow, fast = self._list_both_paths(params)
+            self.assertEqual(slow.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content)
+
+    def test_fast_list_pagination_identical(self):
+        self._create_mixed_recipes()
+        slow, fast = self._list_both_paths({'page_size': 2})
+        cache.clear()
+        slow_next = self.client.get(slow.data['next'])
+        cache.clear()
+        with self.settings(RECIPE_FAST_LIST=True):
+            fast_next = self.client.get(fast.data['next'])
+
+        self.assertEqual(fast_next.content, slow_next.content)
+
+    @override_settings(RECIPE_FAST_LIST=True)
+    def test_fast_list_query_count(self):
+        self._create_mixed_recipes()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertEqual(len(ctx.captured_queries), 3)
+        # related items come straight from the through tables
+        self.assertTrue(ctx.captured_queries[1]['sql'].startswith(
+            'SELECT "core_recipe_tags"."recipe_id"'
+        ))
+
+    def test_list_recipes_msgpack(self):
+        self._create_tagged_recipes(2)
+        json_res = self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(res.content), json_res.json())
+
+    def test_create_recipe_msgpack(self):
+        payload = {"title": "Pesto", "time_minutes": 10, "price": "5.00",
+                   "tags": [{"name": "vegan"}]}
+        res = self.client.post(RECIPES_URL, msgpack.packb(payload),
+                               content_type='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.get().name, 'vegan')
 
 
 class UploadImageTests(TestCase):
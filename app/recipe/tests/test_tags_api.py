@@ -1,13 +1,17 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from decimal import Decimal
 from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
+from recipe.views import TagViewSet
 
 TAGS_URL = reverse("recipe:tag-list")
+TAGS_AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
 
 
 def detail_url(tag_id):
@@ -99,3 +103,53 @@ class PrivateAPITagsTest(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(len(res.data), 1)
+
+    def test_autocomplete_tags(self):
+        Tag.objects.create(name="Dinner", user=self.user)
+        Tag.objects.create(name="dessert", user=self.user)
+        Tag.objects.create(name="breakfast", user=self.user)
+        other = create_user(email="other@example.com")
+        Tag.objects.create(name="diet", user=other)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'D'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([t['name'] for t in res.data], ['dessert', 'Dinner'])
+
+    def test_autocomplete_tags_limit(self):
+        for i in range(5):
+            Tag.objects.create(name=f"tag {i}", user=self.user)
+
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'tag',
+                                                      'limit': 2})
+
+        self.assertEqual([t['name'] for t in res.data], ['tag 0', 'tag 1'])
+
+    def test_autocomplete_empty_prefix(self):
+        Tag.objects.create(name="vegan", user=self.user)
+
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_uses_prefix_index(self):
+        # with a handful of rows the planner may prefer the user_id index
+        # and filter the names; enough rows make the prefix index win
+        Tag.objects.bulk_create(
+            Tag(name=f"tag {i:04d}", user=self.user) for i in range(2000)
+        )
+        Tag.objects.create(name="vegan", user=self.user)
+        view = TagViewSet()
+        view.request = Request(APIRequestFactory().get(TAGS_AUTOCOMPLETE_URL))
+        view.request.user = self.user
+        queryset = view.get_autocomplete_queryset('ve', 10)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE core_tag")
+            cursor.execute("SET enable_seqscan = off")
+            plan = queryset.explain()
+            cursor.execute("RESET enable_seqscan")
+
+        self.assertIn("tag_prefix_idx", plan)
+        self.assertIn("lower((name)::text) ~>=~", plan)
@@ -0,0 +1,131 @@
+"""
+tests for the bounded image upload handling
+"""
+import io
+import shutil
+import struct
+import tempfile
+import zlib
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from PIL import Image, ImageFile
+from core.models import Recipe
+from recipe.uploads import LimitedUploadHandler, UploadTooLarge
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def image_bytes(size=(40, 30), image_format='JPEG'):
+    output = io.BytesIO()
+    Image.effect_noise(size, 60).convert('RGB').save(output, image_format)
+    return output.getvalue()
+
+
+def png_header(width, height):
+    """a PNG declaring width x height pixels, without any pixel data"""
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data)))
+
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr)
+            + chunk(b'IEND', b''))
+
+
+class LimitedUploadHandlerTests(SimpleTestCase):
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1000)
+    def test_declared_length_rejected_before_reading(self):
+        body = mock.Mock()
+        handler = LimitedUploadHandler()
+
+        with self.assertRaises(UploadTooLarge):
+            handler.handle_raw_input(body, {}, 10 * 1024 * 1024, b'x')
+
+        body.read.assert_not_called()
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=1000)
+    def test_stops_streaming_past_limit(self):
+        handler = LimitedUploadHandler()
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+
+        handler.receive_data_chunk(b'x' * 600, 0)
+        with self.assertRaises(UploadTooLarge):
+            handler.receive_data_chunk(b'x' * 600, 600)
+
+        self.assertTrue(handler.file.closed)
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
+class ImageUploadLimitsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Parmigiana', time_minutes=40,
+            price=Decimal('8.50')
+        )
+
+    def upload(self, data, name='photo.jpg'):
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': ContentFile(data, name=name)}, format='multipart'
+        )
+
+    def test_image_within_limits_accepted(self):
+        res = self.upload(image_bytes(image_format='PNG'), 'photo.png')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=2000)
+    def test_oversized_upload_rejected(self):
+        res = self.upload(image_bytes((200, 200)))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        res = self.upload(image_bytes((20, 20)))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('too many pixels', str(res.data['image'][0]))
+
+    def test_decompression_bomb_rejected_without_decoding(self):
+        with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+            res = self.upload(png_header(100_000, 100_000), 'bomb.png')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('too many pixels', str(res.data['image'][0]))
+        load.assert_not_called()
+
+    def test_unsupported_format_rejected(self):
+        res = self.upload(image_bytes(image_format='GIF'), 'photo.gif')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Unsupported image format', str(res.data['image'][0]))
+
+    def test_invalid_image_rejected(self):
+        res = self.upload(b'not an image at all')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,104 @@
+"""
+bounded handling of recipe image uploads
+
+the multipart body is streamed to a temporary file, chunk by chunk, and
+aborted as soon as it passes RECIPE_IMAGE_MAX_BYTES, so an upload never
+sits in worker memory and oversized ones are not read to the end. The
+stored file is then checked from its header only: format against
+RECIPE_IMAGE_FORMATS and width x height against RECIPE_IMAGE_MAX_PIXELS.
+Decompression bombs (small files declaring huge images) are rejected
+there, before Pillow decodes any pixel data.
+"""
+import warnings
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image
+from rest_framework import exceptions, serializers, status
+
+# room for the multipart boundaries and the other form fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(exceptions.APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Upload too large.'
+    default_code = 'upload_too_large'
+
+    def __init__(self, max_bytes):
+        super().__init__(f'Upload too large, the limit is {max_bytes} bytes.')
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    stream uploaded files to disk, stopping once the request has sent
+    more than RECIPE_IMAGE_MAX_BYTES of file data
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = settings.RECIPE_IMAGE_MAX_BYTES
+        self.received = 0
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        # a declared length over the limit is refused before reading
+        if content_length > self.max_bytes + MULTIPART_OVERHEAD:
+            raise UploadTooLarge(self.max_bytes)
+        return super().handle_raw_input(
+            input_data, META, content_length, boundary, encoding
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            # closing deletes the partial temporary file
+            self.file.close()
+            raise UploadTooLarge(self.max_bytes)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def inspect_image(upload):
+    """
+    (format, (width, height)) read from the image header; raises a
+    ValidationError for anything the upload limits do not allow
+    """
+    if upload.size > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise UploadTooLarge(settings.RECIPE_IMAGE_MAX_BYTES)
+
+    position = upload.tell()
+    try:
+        with warnings.catch_warnings():
+            # Pillow only warns about images over its own pixel limit
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            # open() parses the header, the pixel data is not decoded
+            with Image.open(upload) as image:
+                image_format, size = image.format, image.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise serializers.ValidationError('Image has too many pixels.')
+    except Exception:
+        raise serializers.ValidationError('Upload a valid image.')
+    finally:
+        upload.seek(position)
+
+    if image_format not in settings.RECIPE_IMAGE_FORMATS:
+        raise serializers.ValidationError(
+            f'Unsupported image format {image_format}, use one of: '
+            f'{", ".join(settings.RECIPE_IMAGE_FORMATS)}.'
+        )
+    width, height = size
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            f'Image has too many pixels ({width}x{height}), the limit is '
+            f'{settings.RECIPE_IMAGE_MAX_PIXELS}.'
+        )
+    return image_format, size
+
+
+class CheckedImageField(serializers.ImageField):
+    """ImageField validating the upload limits before Pillow's checks"""
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'size') and hasattr(data, 'seek'):
+            inspect_image(data)
+        return super().to_internal_value(data)
@@ -2,7 +2,7 @@ from django.urls import (
     path, include
 )
 from rest_framework.routers import DefaultRouter
-from recipe import views
+from recipe import views, async_views
 
 
 router = DefaultRouter()
@@ -13,5 +13,19 @@ router.register('ingredients', views.IngredientViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('facets/', views.RecipeFacetsView.as_view(), name='facets'),
+    path(
+        'async/recipes/', async_views.recipe_list,
+        name='async-recipe-list'
+    ),
+    path(
+        'async/recipes/<int:pk>/', async_views.recipe_detail,
+        name='async-recipe-detail'
+    ),
+    path('async/tags/', async_views.tag_list, name='async-tag-list'),
+    path(
+        'async/ingredients/', async_views.ingredient_list,
+        name='async-ingredient-list'
+    ),
     path('', include(router.urls))
 ]
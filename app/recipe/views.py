@@ -1,13 +1,36 @@
+from functools import partial
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.db.models.functions import Lower
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from core.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication
+)
 from core.models import Recipe, Tag, Ingredient
+from core.throttling import SlidingWindowThrottle
+from recipe.batch import RecipeBatch
+from recipe.cache import CachedListMixin, ETagMixin
+from recipe.derivatives import delete_derivatives, schedule_derivatives
+from recipe.export import (
+    export_recipes, EXPORT_NDJSON, EXPORT_CSV, EXPORT_CONTENT_TYPES
+)
+from recipe.fastlist import FastListMixin
+from recipe.filters import (
+    filter_recipes, get_ordering, MATCH_ANY, MATCH_ALL, ORDERING_FIELDS
+)
+from recipe.importer import RecipeImporter
+from recipe.pagination import RecipeCursorPagination
 from recipe.serializers import (
     RecipeSerializer, RecipeDetailSerializer, TagSerializer,
     IngredientSerializer, RecipeImageSerializer
 )
+from recipe.uploads import LimitedUploadHandler
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -19,6 +42,12 @@ from drf_spectacular.utils import (
 @extend_schema_view(
     list=extend_schema(
         parameters=[
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Full text search on title and description, '
+                            'results are ranked by relevance',
+            ),
             OpenApiParameter(
                 'tags',
                 OpenApiTypes.STR,
@@ -29,35 +58,137 @@ from drf_spectacular.utils import (
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
             ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=[MATCH_ANY, MATCH_ALL],
+                description='Return recipes matching any (default) or all '
+                            'of the given tags/ingredients',
+            ),
+            OpenApiParameter(
+                'price_min',
+                OpenApiTypes.DECIMAL,
+                description='Only recipes costing at least this much',
+            ),
+            OpenApiParameter(
+                'price_max',
+                OpenApiTypes.DECIMAL,
+                description='Only recipes costing at most this much',
+            ),
+            OpenApiParameter(
+                'time_min',
+                OpenApiTypes.INT,
+                description='Only recipes taking at least these minutes',
+            ),
+            OpenApiParameter(
+                'time_max',
+                OpenApiTypes.INT,
+                description='Only recipes taking at most these minutes',
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR,
+                enum=[f'{prefix}{key}' for key in ORDERING_FIELDS
+                      for prefix in ('', '-')],
+                description='Sort key, newest first (-id) by default',
+            ),
+            OpenApiParameter(
+                'fields',
+                OpenApiTypes.STR,
+                description='Comma separated list of fields to return',
+            ),
+        ]
+    ),
+    export=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'export_format',
+                OpenApiTypes.STR, enum=[EXPORT_NDJSON, EXPORT_CSV],
+                description='Export as NDJSON (default) or CSV',
+            ),
+        ],
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR,
+                   (200, 'text/csv'): OpenApiTypes.STR},
+    ),
+    retrieve=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'fields',
+                OpenApiTypes.STR,
+                description='Comma separated list of fields to return',
+            ),
         ]
     )
 )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ETagMixin, CachedListMixin, FastListMixin,
+                    viewsets.ModelViewSet):
     "ADD CRUD on model"
     """ view for manage recipe APIs"""
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication, SignedTokenAuthentication
+    ]
     permission_classes = [IsAuthenticated]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'recipe'
+    pagination_class = RecipeCursorPagination
+    related_fields = {'tags': Tag, 'ingredients': Ingredient}
+    export_chunk_size = 1000
+    import_batch_size = 500
+    batch_max_operations = 100
 
-    def _params_to_int(self, qs):
-        return [int(str_id) for str_id in qs.split(",")]
+    def _requested_fields(self):
+        """fields selected with ?fields=, None when all are wanted"""
+        fields = self.request.query_params.get('fields')
+        if not fields or self.action not in ('list', 'retrieve'):
+            return None
 
-    def get_queryset(self):
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset.filter(user=self.request.user)
-        if tags:
-            tags_id = self._params_to_int(tags)
-            queryset = queryset.filter(tags__id__in=tags_id)
+        requested = [f.strip() for f in fields.split(',') if f.strip()]
+        readable = self.get_serializer_class()().fields.items()
+        allowed = [name for name, field in readable if not field.write_only]
+        unknown = [f for f in requested if f not in allowed]
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Unknown fields: {", ".join(unknown)}'}
+            )
+        return requested
 
-        if ingredients:
-            ingr_id = self._params_to_int(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingr_id)
+    def _prefetch(self, names):
+        # related items are ordered by id so the output is deterministic
+        return [
+            Prefetch(name, queryset=model.objects.order_by('id'))
+            for name, model in self.related_fields.items() if name in names
+        ]
 
+    def get_queryset(self):
         """retrieve recipes for authenticated user"""
-        return queryset.order_by('-id').distinct()
+        fields = self._requested_fields()
+        queryset = self.queryset.filter(user=self.request.user)
+        if fields is None:
+            queryset = queryset.prefetch_related(
+                *self._prefetch(self.related_fields)
+            )
+        else:
+            # read only the requested columns and skip unused M2M joins;
+            # the sort keys stay loaded, the paginator reads them from
+            # every row to build its cursor
+            serializer_fields = self.get_serializer_class()().fields
+            columns = [
+                serializer_fields[f].source
+                for f in fields if f not in self.related_fields
+            ]
+            columns += [
+                key.lstrip('-')
+                for key in get_ordering(self.request.query_params) or ()
+            ]
+            related = [f for f in fields if f in self.related_fields]
+            queryset = queryset.only('id', *columns).prefetch_related(
+                *self._prefetch(related)
+            )
+        queryset = filter_recipes(queryset, self.request.query_params)
+
+        return queryset.order_by('-id')
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -67,15 +198,93 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def get_serializer(self, *args, **kwargs):
+        fields = self._requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """stream all (filtered) recipes as NDJSON or CSV"""
+        export_format = request.query_params.get(
+            'export_format', EXPORT_NDJSON
+        )
+        if export_format not in EXPORT_CONTENT_TYPES:
+            raise ValidationError(
+                {'export_format': f'Must be one of: {EXPORT_NDJSON}, '
+                                  f'{EXPORT_CSV}.'}
+            )
+
+        stream = export_recipes(
+            self.get_queryset(), export_format, self.export_chunk_size,
+            context=self.get_serializer_context()
+        )
+        response = StreamingHttpResponse(
+            stream, content_type=EXPORT_CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_format}"'
+        )
+        return response
+
+    @extend_schema(
+        request={'application/x-ndjson': OpenApiTypes.STR},
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=['POST'], detail=False, url_path='import')
+    def bulk_import(self, request):
+        """
+        create recipes from an NDJSON body, one recipe per line
+
+        lines that fail validation are reported and skipped
+        """
+        importer = RecipeImporter(
+            request.user, self.import_batch_size,
+            context=self.get_serializer_context()
+        )
+        result = importer.run(request.stream or [])
+        return Response(result, status=status.HTTP_200_OK)
+
+    @extend_schema(request=OpenApiTypes.OBJECT, responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=False, url_path='batch')
+    def batch(self, request):
+        """
+        run a list of create/patch/delete operations in one transaction
+
+        body: {"operations": [{"op": "create", "data": {...}},
+                              {"op": "patch", "id": 1, "data": {...}},
+                              {"op": "delete", "id": 2}]}
+        """
+        operations = request.data.get('operations') \
+            if isinstance(request.data, dict) else None
+        if not isinstance(operations, list):
+            raise ValidationError(
+                {'operations': 'Expected a list of operations.'}
+            )
+        if len(operations) > self.batch_max_operations:
+            raise ValidationError(
+                {'operations': f'At most {self.batch_max_operations} '
+                               f'operations per batch.'}
+            )
+
+        batch = RecipeBatch(request.user, self.get_serializer_context())
+        return Response({'results': batch.run(operations)})
+
     @action(methods=['POST'], detail=True, url_path='upload_image')
     def upload_image(self, request, pk=None):
+        # set before request.data is parsed
+        request.upload_handlers = [LimitedUploadHandler(request)]
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            stale = list(recipe.image_derivatives.values())
+            serializer.save(image_derivatives={})
+            transaction.on_commit(partial(delete_derivatives, stale))
+            schedule_derivatives(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -89,9 +298,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 description='Filter by items assigned to recipes.',
             ),
         ]
+    ),
+    autocomplete=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Case insensitive name prefix to complete',
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Maximum number of suggestions (default 10)',
+            ),
+        ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin, mixins.UpdateModelMixin,
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            mixins.DestroyModelMixin, mixins.UpdateModelMixin,
                             mixins.ListModelMixin, viewsets.GenericViewSet):
     '''
     DestroyModelMixin add DELETE endpoint
@@ -99,8 +323,13 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin, mixins.UpdateModelMixin,
     ListModelMixin add LIST endpoint
     GenericViewSet add c8000reate method
     '''
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication, SignedTokenAuthentication
+    ]
     permission_classes = [IsAuthenticated]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'recipe'
+    autocomplete_max_limit = 50
 
     def get_queryset(self):
         queryset = self.queryset.filter(user=self.request.user)
@@ -111,6 +340,34 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin, mixins.UpdateModelMixin,
             queryset = self.queryset.filter(recipe__isnull=False)
         return queryset.order_by('-name').distinct()
 
+    def get_autocomplete_queryset(self, prefix, limit):
+        """the user's names starting with the lowercase prefix"""
+        return self.queryset.filter(user=self.request.user).alias(
+            name_lower=Lower('name')
+        ).filter(name_lower__startswith=prefix).order_by(
+            'name_lower', 'id'
+        )[:limit]
+
+    @action(methods=['GET'], detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        """
+        top matches for a name prefix, served by the (user, lower(name))
+        index
+        """
+        prefix = request.query_params.get('q', '').strip().lower()
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        limit = max(1, min(limit, self.autocomplete_max_limit))
+
+        if not prefix:
+            return Response([])
+
+        queryset = self.get_autocomplete_queryset(prefix, limit)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """manage tags """
@@ -121,3 +378,68 @@ class TagViewSet(BaseRecipeAttrViewSet):
 class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            'search',
+            OpenApiTypes.STR,
+            description='Full text search on title and description',
+        ),
+        OpenApiParameter(
+            'tags',
+            OpenApiTypes.STR,
+            description='Comma separated list of tag IDs to filter',
+        ),
+        OpenApiParameter(
+            'ingredients',
+            OpenApiTypes.STR,
+            description='Comma separated list of ingredient IDs to filter',
+        ),
+        OpenApiParameter(
+            'match',
+            OpenApiTypes.STR, enum=[MATCH_ANY, MATCH_ALL],
+            description='Match any (default) or all of the given '
+                        'tags/ingredients',
+        ),
+    ],
+    responses=OpenApiTypes.OBJECT,
+)
+class RecipeFacetsView(APIView):
+    """
+    per tag and per ingredient recipe counts for the filtered recipes,
+    one grouped query each
+    """
+    authentication_classes = [
+        CachedTokenAuthentication, SignedTokenAuthentication
+    ]
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'recipe'
+
+    def _counts(self, through, field, recipes):
+        rows = through.objects.filter(
+            recipe_id__in=recipes.values('id')
+        ).values(
+            f'{field}_id', f'{field}__name'
+        ).annotate(count=Count('recipe_id')).order_by('-count', f'{field}_id')
+        return [
+            {
+                'id': row[f'{field}_id'],
+                'name': row[f'{field}__name'],
+                'count': row['count'],
+            }
+            for row in rows
+        ]
+
+    def get(self, request):
+        recipes = filter_recipes(
+            Recipe.objects.filter(user=request.user), request.query_params
+        )
+        return Response({
+            'tags': self._counts(Recipe.tags.through, 'tag', recipes),
+            'ingredients': self._counts(
+                Recipe.ingredients.through, 'ingredient', recipes
+            ),
+        })
@@ -41,4 +41,8 @@ class AuthTokenSerializer(serializers.Serializer):
             msg = _("Unable to authenticate User")
             raise serializers.ValidationError(msg, code="authorization")
         attrs['user'] = user
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(trim_whitespace=False)
@@ -0,0 +1,205 @@
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from core import tokens
+from core.authentication import SignedTokenAuthentication
+
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+RECIPES_URL = reverse('recipe:recipe-list')
+ASYNC_TAGS_URL = reverse('recipe:async-tag-list')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+@override_settings(AUTH_TOKEN_MODE='signed')
+class SignedTokenApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches[settings.TOKEN_REVOCATION_CACHE_ALIAS].clear()
+        self.user = create_user(
+            email='test@example.com', password='testpass123', name='Test'
+        )
+        self.client = APIClient()
+
+    def _login(self):
+        res = self.client.post(
+            TOKEN_URL, {'email': self.user.email, 'password': 'testpass123'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def _bearer(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_token_endpoint_issues_signed_pair(self):
+        data = self._login()
+
+        self.assertEqual(set(data), {'access', 'refresh', 'expires_in'})
+        self.assertEqual(tokens.decode(data['access'], 'access')['uid'],
+                         self.user.id)
+
+    @override_settings(AUTH_TOKEN_MODE='db')
+    def test_db_mode_issues_database_token(self):
+        res = self.client.post(
+            TOKEN_URL, {'email': self.user.email, 'password': 'testpass123'}
+        )
+
+        self.assertIn('token', res.data)
+
+    def test_access_token_verified_without_queries(self):
+        access = self._login()['access']
+        request = APIRequestFactory().get(
+            ME_URL, HTTP_AUTHORIZATION=f'Bearer {access}'
+        )
+
+        with self.assertNumQueries(0):
+            user, payload = SignedTokenAuthentication().authenticate(request)
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(payload['typ'], 'access')
+
+    def test_access_token_authenticates_api(self):
+        self._bearer(self._login()['access'])
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(
+            self.client.get(RECIPES_URL).status_code, status.HTTP_200_OK
+        )
+        self.assertEqual(
+            self.client.get(ASYNC_TAGS_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_tampered_token_rejected(self):
+        access = self._login()['access']
+        self._bearer(access[:-2] + ('aa' if access[-2:] != 'aa' else 'bb'))
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_not_accepted_as_access(self):
+        self._bearer(self._login()['refresh'])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_access_token_rejected(self):
+        access = self._login()['access']
+        self._bearer(access)
+        issued = tokens.decode(access, 'access')['iat']
+
+        with mock.patch('django.core.signing.time.time') as now:
+            now.return_value = issued + 301
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(str(res.data['detail']), 'Token expired.')
+
+    def test_key_rotation(self):
+        with override_settings(SECRET_KEY='old-key'):
+            access = self._login()['access']
+        self._bearer(access)
+
+        with override_settings(SECRET_KEY='new-key'):
+            rejected = self.client.get(ME_URL)
+        with override_settings(
+            SECRET_KEY='new-key', SECRET_KEY_FALLBACKS=['old-key']
+        ):
+            accepted = self.client.get(ME_URL)
+
+        self.assertEqual(rejected.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(accepted.status_code, status.HTTP_200_OK)
+
+    def test_refresh_rotates_pair(self):
+        data = self._login()
+
+        res = self.client.post(REFRESH_URL, {'refresh': data['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self._bearer(res.data['access'])
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
+
+        reused = self.client.post(REFRESH_URL, {'refresh': data['refresh']})
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rejects_access_token(self):
+        data = self._login()
+
+        res = self.client.post(REFRESH_URL, {'refresh': data['access']})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocations_survive_response_cache_churn(self):
+        data = self._login()
+        self.client.post(REVOKE_URL, {'refresh': data['refresh']})
+
+        # the default cache culls entries once it is full
+        cache.clear()
+
+        refresh = self.client.post(REFRESH_URL, {'refresh': data['refresh']})
+        self.assertEqual(refresh.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke_logs_out(self):
+        data = self._login()
+        self._bearer(data['access'])
+
+        res = self.client.post(REVOKE_URL, {'refresh': data['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        refresh = self.client.post(REFRESH_URL, {'refresh': data['refresh']})
+        self.assertEqual(refresh.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_tokens(self):
+        data = self._login()
+        self._bearer(data['access'])
+
+        self.client.patch(ME_URL, {'password': 'newpass123'})
+
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        refresh = self.client.post(REFRESH_URL, {'refresh': data['refresh']})
+        self.assertEqual(refresh.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivation_revokes_tokens(self):
+        data = self._login()
+        self._bearer(data['access'])
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_tokens_revoked(self):
+        self._bearer(self._login()['access'])
+
+        self.user.delete()
+
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_keeps_tokens(self):
+        self._bearer(self._login()['access'])
+
+        self.client.patch(ME_URL, {'name': 'Renamed'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Renamed')
@@ -1,7 +1,17 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 from rest_framework.authtoken.views import ObtainAuthToken
-from user.serializers import AuthTokenSerializer, UserSerializer
+from core import tokens
+from core.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication
+)
+from core.throttling import SlidingWindowThrottle
+from user.serializers import (
+    AuthTokenSerializer, UserSerializer, RefreshTokenSerializer
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -10,13 +20,70 @@ class CreateUserView(generics.CreateAPIView):
 
 class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
-    render_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'token'
+
+    def post(self, request, *args, **kwargs):
+        if settings.AUTH_TOKEN_MODE != 'signed':
+            return super().post(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(tokens.issue_tokens(serializer.validated_data['user']))
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """exchange a refresh token for a new access/refresh pair"""
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'token'
+
+    def get_authenticate_header(self, request):
+        # invalid refresh tokens are answered with 401, not 403
+        return SignedTokenAuthentication.keyword
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            tokens.refresh_tokens(serializer.validated_data['refresh'])
+        )
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    """
+    revoke a refresh token, and the access token authenticating the
+    request if any
+    """
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = [SignedTokenAuthentication]
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tokens.revoke(tokens.verify(
+            serializer.validated_data['refresh'], tokens.REFRESH
+        ))
+        if request.auth is not None:
+            tokens.revoke(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication, SignedTokenAuthentication
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        user = self.request.user
+        if user.get_deferred_fields():
+            # signed tokens only carry the user id, load the rest at once
+            user = get_user_model().objects.get(pk=user.pk)
+        return user
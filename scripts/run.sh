@@ -1,7 +1,13 @@
 #! /bin/sh
 set -e
+# read by the settings too: several workers need shared caches
+export WEB_WORKERS="${WEB_WORKERS:-4}"
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
+python manage.py createcachetable
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
+# spawned image workers (recipe.derivatives) start sys.executable, which
+# uWSGI sets to its own binary unless told otherwise
+uwsgi --socket :9000 --workers "$WEB_WORKERS" --master --enable-threads --module app.wsgi \
+    --py-sys-executable "$(command -v python)"